@@ -1,6 +1,7 @@
 import functools
 
 from .hook import pre_execute, pre_get_input_data
+from . import routes  # noqa: F401  (registers the server routes)
 import execution
 
 
@@ -1,15 +1,19 @@
 import json
 import os
-import re
 from collections import defaultdict
 from . import hook
-from .defs.captures import CAPTURE_FIELD_LIST
+from .defs import ensure_extensions
+from .defs.captures import CAPTURE_FIELD_LIST, NODE_EXTRACTORS
 from .defs.meta import MetaField
 from .defs.formatters import calc_lora_hash, calc_model_hash, extract_embedding_names, extract_embedding_hashes
+from .utils.guard import EXTRACTOR_GUARD, SKIPPED
+from .utils.lazy import LazyValue, resolve
+from .utils.parameters import format_parameters
+from .utils.prompt_text import analyze_prompt, clean_lora_name
 from .utils.log import print_warning
 
 from nodes import NODE_CLASS_MAPPINGS
-from .trace import Trace
+from .trace import Trace, FieldIndex
 from execution import get_input_data
 from comfy_execution.graph import DynamicPrompt
 
@@ -42,10 +46,17 @@ class OutputCacheCompat:
 
 class Capture:
     @classmethod
-    def get_inputs(cls):
+    def get_inputs(cls, node_ids=None):
+        """
+        Collect the captured values of the prompt's nodes.
+        `node_ids` restricts the scan to those nodes (the candidates of a CapturePlan).
+        """
         inputs = {}
         prompt = hook.current_prompt
         extra_data = hook.current_extra_data
+        if node_ids is None:
+            ensure_extensions(prompt)
+            node_ids = prompt
 
         if hook.prompt_executer and hook.prompt_executer.caches:
             raw_outputs = hook.prompt_executer.caches.outputs
@@ -57,8 +68,14 @@ class Capture:
         else:
             outputs = None
 
-        for node_id, obj in prompt.items():
+        for node_id in node_ids:
+            obj = prompt[node_id]
             class_type = obj["class_type"]
+            metas = CAPTURE_FIELD_LIST.get(class_type)
+            extractor = NODE_EXTRACTORS.get(class_type)
+            if not metas and not extractor:
+                continue
+
             obj_class = NODE_CLASS_MAPPINGS[class_type]
             node_inputs = obj["inputs"]
 
@@ -66,78 +83,96 @@ class Capture:
                 node_inputs, obj_class, node_id, outputs, DynamicPrompt(prompt), extra_data
             )
 
+            # A node-level extractor parses the node once and returns all of its fields
+            extracted = {}
+            if extractor:
+                extracted = EXTRACTOR_GUARD.call(
+                    extractor, class_type, node_id, obj, prompt, extra_data, outputs, input_data
+                )
+                if extracted is SKIPPED or not extracted:
+                    extracted = {}
+                for meta, v in extracted.items():
+                    inputs.setdefault(meta, [])
+                    cls._append_value(inputs, meta, node_id, v, class_type)
+
             # Process field data mappings for the captured inputs
-            for node_class, metas in CAPTURE_FIELD_LIST.items():
-                if class_type != node_class:
+            for meta, field_data in (metas or {}).items():
+                # Fields returned by the extractor take precedence
+                if meta in extracted:
                     continue
 
-                for meta, field_data in metas.items():
-                    # Skip invalidated nodes
-                    if field_data.get("validate") and not field_data["validate"](
-                        node_id, obj, prompt, extra_data, outputs, input_data
-                    ):
+                # Skip invalidated nodes (a failing or disabled validator invalidates too)
+                validate = field_data.get("validate")
+                if validate:
+                    valid = EXTRACTOR_GUARD.call(
+                        validate, class_type, node_id, obj, prompt, extra_data, outputs, input_data
+                    )
+                    if valid is SKIPPED or not valid:
                         continue
 
-                    # Initialize list for meta if not exists
-                    if meta not in inputs:
-                        inputs[meta] = []
+                # Initialize list for meta if not exists
+                if meta not in inputs:
+                    inputs[meta] = []
 
-                    # Get field value or selector
-                    value = field_data.get("value")
-                    if value is not None:
-                        inputs[meta].append((node_id, value))
-                        continue
+                # Get field value or selector
+                value = field_data.get("value")
+                if value is not None:
+                    inputs[meta].append((node_id, value))
+                    continue
 
-                    selector = field_data.get("selector")
-                    if selector:
-                        v = selector(node_id, obj, prompt, extra_data, outputs, input_data)
-                        cls._append_value(inputs, meta, node_id, v)
-                        continue
+                selector = field_data.get("selector")
+                if selector:
+                    v = EXTRACTOR_GUARD.call(
+                        selector, class_type, node_id, obj, prompt, extra_data, outputs, input_data
+                    )
+                    if v is not SKIPPED:
+                        cls._append_value(inputs, meta, node_id, v, class_type)
+                    continue
 
-                    # Fetch and process value from field_name
-                    field_name = field_data["field_name"]
-                    value = input_data[0].get(field_name)
-                    if value is not None:
-                        format_func = field_data.get("format")
-                        v = cls._apply_formatting(value, input_data, format_func)
-                        cls._append_value(inputs, meta, node_id, v)
+                # Fetch and process value from field_name
+                field_name = field_data["field_name"]
+                value = input_data[0].get(field_name)
+                if value is not None:
+                    format_func = field_data.get("format")
+                    v = cls._apply_formatting(value, input_data, format_func, class_type)
+                    cls._append_value(inputs, meta, node_id, v, class_type)
 
         return inputs
 
     @staticmethod
-    def _apply_formatting(value, input_data, format_func):
-        """Apply formatting to a value using the given format function."""
+    def _apply_formatting(value, input_data, format_func, class_type=None):
+        """Apply formatting to a value using the given format function.
+        Deferred formatters (e.g. hashing) are wrapped in a LazyValue and only run once the value is emitted.
+        """
         if isinstance(value, list) and len(value) > 0:
             value = value[0]
         if format_func:
-            value = format_func(value, input_data)
+            if getattr(format_func, "deferred", False):
+                return LazyValue(format_func, value, input_data)
+            value = EXTRACTOR_GUARD.call(format_func, class_type, value, input_data)
+            if value is SKIPPED:
+                return None
         return value
 
     @staticmethod
-    def _append_value(inputs, meta, node_id, value):
-        """Append processed value to the inputs list."""
-        if isinstance(value, list):
-            for x in value:
-                inputs[meta].append((node_id, x))
-        elif value is not None:
-            inputs[meta].append((node_id, value))
+    def _append_value(inputs, meta, node_id, value, class_type=None):
+        """Append processed value to the inputs list. Lazy values are attributed to `class_type`."""
+        values = value if isinstance(value, list) else [value] if value is not None else []
+        for x in values:
+            if isinstance(x, LazyValue) and x.class_type is None:
+                x.class_type = class_type
+            inputs[meta].append((node_id, x))
 
     @classmethod
     def get_lora_strings_and_hashes(cls, inputs_before_sampler_node):
-
-        def clean_name(n):
-            return os.path.splitext(os.path.basename(n))[0].replace('\\', '_').replace('/', '_').replace(' ', '_').replace(':', '_')
-
-        # Regex to match <lora:name:weight>, based on https://github.com/civitai/civitai/blob/main/src/utils/prompt-helpers.ts
-        lora_assertion_re = re.compile(r"<(lora|lyco):([a-zA-Z0-9_\./\\-]+):([0-9.]+)>")
-
         prompt_texts = [
             val[1]
             for key in [MetaField.POSITIVE_PROMPT, MetaField.NEGATIVE_PROMPT]
             for val in inputs_before_sampler_node.get(key, [])
             if isinstance(val[1], str)
         ]
-        prompt_joined = " ".join(prompt_texts).replace("\n", " ").replace("\r", " ").lower()
+        analyses = [analyze_prompt(text) for text in prompt_texts]
+        has_lora_tags = any(analysis.has_lora_tags for analysis in analyses)
 
         lora_names = inputs_before_sampler_node.get(MetaField.LORA_MODEL_NAME, [])
         lora_weights = inputs_before_sampler_node.get(MetaField.LORA_STRENGTH_MODEL, [])
@@ -145,13 +180,13 @@ class Capture:
 
         # Parse LoRAs in prompt
         lora_names_from_prompt, lora_weights_from_prompt, lora_hashes_from_prompt = [], [], []
-        if "<lora:" in prompt_joined:
-            for text in prompt_texts:
-                for _, name, weight in re.findall(lora_assertion_re, text.replace("\n", " ").replace("\r", " ")):
-                    lora_names_from_prompt.append(("prompt_parse", name))
-                    lora_weights_from_prompt.append(("prompt_parse", float(weight)))
+        if has_lora_tags:
+            for analysis in analyses:
+                for lora_tag in analysis.lora_tags:
+                    lora_names_from_prompt.append(("prompt_parse", lora_tag.name))
+                    lora_weights_from_prompt.append(("prompt_parse", lora_tag.weight))
 
-                    h = calc_lora_hash(name)
+                    h = calc_lora_hash(lora_tag.name)
                     if h:
                         lora_hashes_from_prompt.append(("prompt_parse", h))
 
@@ -169,28 +204,27 @@ class Capture:
         for name, weight, hsh in zip(all_names, all_weights, all_hashes):
             if not (name and weight and hsh):
                 continue
-            grouped[(hsh[1], weight[1])].append(clean_name(name[1]))
+            # Deferred hashes resolve to None when hashing failed or the extractor guard skipped it
+            hash_value = resolve(hsh[1])
+            if not hash_value:
+                continue
+            grouped[(hash_value, weight[1])].append(clean_lora_name(name[1]))
 
-        hashes_in_prompt = {h[1].lower() for h in lora_hashes_from_prompt}
+        hashes_in_prompt = {h[1].lower() for h in lora_hashes_from_prompt if h[1]}
 
         lora_strings, lora_hashes_list = [], []
 
         for (hsh, weight), names in grouped.items():
             canonical = min(names, key=len)
-            present = hsh.lower() in hashes_in_prompt
+            present = str(hsh).lower() in hashes_in_prompt
 
             if not present:
                 lora_strings.append(f"<lora:{canonical}:{weight}>")
             lora_hashes_list.append(f"{canonical}: {hsh}")
 
         # Rewrite prompt with cleaned names
-        updated_prompts = []
-        if "<lora:" in prompt_joined:
-            for text in prompt_texts:
-                def replace(m):
-                    tag, raw_name, weight = m.group(1), m.group(2), m.group(3)
-                    return f"<{tag}:{clean_name(raw_name)}:{weight}>"
-                updated_prompts.append(lora_assertion_re.sub(replace, text))
+        if has_lora_tags:
+            updated_prompts = [analysis.rewritten for analysis in analyses]
         else:
             updated_prompts = prompt_texts
 
@@ -223,7 +257,7 @@ class Capture:
                 # Guard against malformed link entries with length < 2
                 if len(link) <= 1:
                     continue
-                candidate = link[1]
+                candidate = resolve(link[1])
                 # Skip if None
                 if candidate is None:
                     continue
@@ -337,23 +371,26 @@ class Capture:
             if value is not None:
                 result_dict[meta].append((node_id, value, 0))
 
+        # Build the field index once and answer every lookup below from it
+        field_index = FieldIndex(prompt)
+
         # Detect nodes with specific fields
         resolved = {
-            "prompt": Trace.find_node_with_fields(prompt, {"positive", "negative"}),
-            "denoise": Trace.find_node_with_fields(prompt, {"denoise"}),
-            "sampler": Trace.find_node_with_fields(prompt, {"seed", "steps", "cfg", "sampler_name", "scheduler"}),
-            "size": Trace.find_node_with_fields(prompt, {"width", "height"}),
-            "model": Trace.find_node_with_fields(prompt, {"ckpt_name"}),
+            "prompt": Trace.find_node_with_fields(prompt, {"positive", "negative"}, field_index),
+            "denoise": Trace.find_node_with_fields(prompt, {"denoise"}, field_index),
+            "sampler": Trace.find_node_with_fields(prompt, {"seed", "steps", "cfg", "sampler_name", "scheduler"}, field_index),
+            "size": Trace.find_node_with_fields(prompt, {"width", "height"}, field_index),
+            "model": Trace.find_node_with_fields(prompt, {"ckpt_name"}, field_index),
         }
 
         # LoRA metadata (multiple)
-        for node_id, node in Trace.find_all_nodes_with_fields(prompt, {"lora_name", "strength_model"}):
+        for node_id, node in Trace.find_all_nodes_with_fields(prompt, {"lora_name", "strength_model"}, field_index):
             if node is not None:
                 inputs = node.get("inputs", {})
                 name = inputs.get("lora_name")
                 strength = inputs.get("strength_model")
                 _append_metadata(MetaField.LORA_MODEL_NAME, node_id, name)
-                _append_metadata(MetaField.LORA_MODEL_HASH, node_id, calc_lora_hash(name) if name else None)
+                _append_metadata(MetaField.LORA_MODEL_HASH, node_id, LazyValue(calc_lora_hash, name) if name else None)
                 _append_metadata(MetaField.LORA_STRENGTH_MODEL, node_id, strength)
 
         # Model metadata
@@ -363,7 +400,7 @@ class Capture:
             inputs = node.get("inputs", {})
             name = inputs.get("ckpt_name")
             _append_metadata(MetaField.MODEL_NAME, node_id, name)
-            _append_metadata(MetaField.MODEL_HASH, node_id, calc_model_hash(name) if name else None)
+            _append_metadata(MetaField.MODEL_HASH, node_id, LazyValue(calc_model_hash, name) if name else None)
 
         # Denoise
         denoise_node = resolved.get("denoise")
@@ -398,7 +435,7 @@ class Capture:
                 _append_metadata(meta, node_id, inputs.get(key))
 
         # Prompt fields
-        for node_id, node in Trace.find_all_nodes_with_fields(prompt, {"positive", "negative"}):
+        for node_id, node in Trace.find_all_nodes_with_fields(prompt, {"positive", "negative"}, field_index):
             if node is not None:
                 inputs = node.get("inputs", {})
                 pos_ref = inputs.get("positive", [None])[0]
@@ -441,7 +478,9 @@ class Capture:
         for index, (model_name, model_hash) in enumerate(zip(model_names, model_hashes)):
             field_prefix = f"{prefix}_{index}"
             model_info_dict[f"{field_prefix} name"] = os.path.splitext(os.path.basename(model_name[1]))[0]
-            model_info_dict[f"{field_prefix} hash"] = model_hash[1]
+            hash_value = resolve(model_hash[1])
+            if hash_value:
+                model_info_dict[f"{field_prefix} hash"] = hash_value
 
         return model_info_dict
 
@@ -455,46 +494,22 @@ class Capture:
 
     @classmethod
     def gen_parameters_str(cls, pnginfo_dict):
-        if not pnginfo_dict or not isinstance(pnginfo_dict, dict):
-            return ""
-
-        def clean_value(value):
-            if value is None:
-                return ""
-            return str(value).strip().replace("\n", " ")
-
-        def strip_embedding_prefix(text):
-            return text.replace("embedding:", "")
-
-        cleaned_dict = {k: clean_value(v) for k, v in pnginfo_dict.items()}
-
-        pos = strip_embedding_prefix(cleaned_dict.get("Positive prompt", ""))
-        neg = strip_embedding_prefix(cleaned_dict.get("Negative prompt", ""))
-
-        result = [pos]
-        if neg:
-            result.append(f"Negative prompt: {neg}")
-
-        s_list = [
-            f"{k}: {v}"
-            for k, v in cleaned_dict.items()
-            if k not in {"Positive prompt", "Negative prompt"} and v not in {None, ""}
-        ]
-
-        result.append(", ".join(s_list))
-        return "\n".join(result)
+        return format_parameters(pnginfo_dict)
 
     @classmethod
     def get_hashes_for_civitai(cls, inputs_before_sampler_node, inputs_before_this_node):
         def extract_single(inputs, key):
             items = inputs.get(key, [])
-            return items[0][1] if items and len(items[0]) > 1 else None
+            return resolve(items[0][1]) if items and len(items[0]) > 1 else None
 
         def extract_named_hashes(names, hashes, prefix):
             result = {}
             for name, h in zip(names, hashes):
+                value = resolve(h[1])
+                if not value:
+                    continue
                 base_name = os.path.splitext(os.path.basename(name[1]))[0]
-                result[f"{prefix}:{base_name}"] = h[1]
+                result[f"{prefix}:{base_name}"] = value
             return result
 
         resource_hashes = {}
@@ -1,8 +1,32 @@
 import os
-from .captures import CAPTURE_FIELD_LIST
+from . import captures, formatters, validators
+from .captures import CAPTURE_FIELD_LIST, NODE_EXTRACTORS
 from .samplers import SAMPLERS
-from .loader import load_extensions
+from .loader import ExtensionLoader
+from .spec import SpecRegistry, SPEC_DIR
+from ..utils.guard import EXTRACTOR_GUARD
 
-# load CAPTURE_FIELD_LIST and SAMPLERS in ext folder
+# The core rules are timed by the extractor guard, but never disabled
+EXTRACTOR_GUARD.trust(captures.__name__, formatters.__name__, validators.__name__)
+
+# CAPTURE_FIELD_LIST, SAMPLERS and NODE_EXTRACTORS in the ext folder are loaded on demand,
+# once one of their class_types shows up in a prompt
 ext_dir = os.path.join(os.path.dirname(__file__), "ext")
-load_extensions(ext_dir, __package__, CAPTURE_FIELD_LIST, SAMPLERS)
+EXTENSIONS = ExtensionLoader(ext_dir, __package__, CAPTURE_FIELD_LIST, SAMPLERS, NODE_EXTRACTORS)
+
+# Declarative specs are cheap to compile, so they are loaded at startup and hot-reloaded
+SPECS = SpecRegistry(SPEC_DIR, CAPTURE_FIELD_LIST, SAMPLERS)
+
+
+def ensure_extensions(prompt):
+    """Load the capture definitions needed by the class_types of `prompt`, picking up spec changes."""
+    SPECS.reload_if_changed()
+    loaded = EXTENSIONS.ensure_loaded(node.get("class_type") for node in prompt.values())
+    if loaded:
+        # Ext modules replace whole entries; put the spec fields back on top
+        SPECS.reapply(loaded)
+
+
+def registry_version():
+    """Changes whenever definitions are loaded or reloaded, so cached capture plans can be invalidated."""
+    return EXTENSIONS.version, SPECS.version
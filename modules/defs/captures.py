@@ -146,3 +146,8 @@ CAPTURE_FIELD_LIST = {
         MetaField.SEED: {"field_name": "noise_seed"},
     },
 }
+
+# Node-level extractors: class_type -> function(node_id, obj, prompt, extra_data, outputs, input_data)
+# returning {MetaField: value or list of values} for the whole node in a single call.
+# Capture.get_inputs prefers them over the per-field entries of CAPTURE_FIELD_LIST.
+NODE_EXTRACTORS = {}
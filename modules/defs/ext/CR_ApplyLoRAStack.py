@@ -1,6 +1,6 @@
 import os
 from ..meta import MetaField
-from ..formatters import calc_lora_hash
+from ..formatters import calc_lora_hash, LazyValue
 
 def _unwrap_input_value(value):
     """
@@ -40,27 +40,18 @@ def get_cr_lora_info_from_widgets(input_data):
         
     return names, model_strengths, clip_strengths
 
-def get_cr_lora_names_from_node(node_id, obj, prompt, extra_data, outputs, input_data):
-    names, _, _ = get_cr_lora_info_from_widgets(input_data)
-    return names if names else None
-
-def get_cr_lora_hashes_from_node(node_id, obj, prompt, extra_data, outputs, input_data):
-    names, _, _ = get_cr_lora_info_from_widgets(input_data)
-    return [calc_lora_hash(name) for name in names] if names else None
-
-def get_cr_lora_strength_model_from_node(node_id, obj, prompt, extra_data, outputs, input_data):
-    _, model_strengths, _ = get_cr_lora_info_from_widgets(input_data)
-    return model_strengths if model_strengths else None
-
-def get_cr_lora_strength_clip_from_node(node_id, obj, prompt, extra_data, outputs, input_data):
-    _, _, clip_strengths = get_cr_lora_info_from_widgets(input_data)
-    return clip_strengths if clip_strengths else None
-
-CAPTURE_FIELD_LIST = {
-    "CR LoRA Stack": {
-        MetaField.LORA_MODEL_NAME:     {"selector": get_cr_lora_names_from_node},
-        MetaField.LORA_MODEL_HASH:     {"selector": get_cr_lora_hashes_from_node},
-        MetaField.LORA_STRENGTH_MODEL: {"selector": get_cr_lora_strength_model_from_node},
-        MetaField.LORA_STRENGTH_CLIP:  {"selector": get_cr_lora_strength_clip_from_node},
-    },
+def extract_cr_lora_stack(node_id, obj, prompt, extra_data, outputs, input_data):
+    """
+    Parses the widgets once and returns every LoRA MetaField of a 'CR LoRA Stack' node.
+    """
+    names, model_strengths, clip_strengths = get_cr_lora_info_from_widgets(input_data)
+    return {
+        MetaField.LORA_MODEL_NAME:     names,
+        MetaField.LORA_MODEL_HASH:     [LazyValue(calc_lora_hash, name) for name in names],
+        MetaField.LORA_STRENGTH_MODEL: model_strengths,
+        MetaField.LORA_STRENGTH_CLIP:  clip_strengths,
+    }
+
+NODE_EXTRACTORS = {
+    "CR LoRA Stack": extract_cr_lora_stack,
 }
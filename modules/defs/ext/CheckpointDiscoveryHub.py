@@ -2,7 +2,7 @@
 
 import json
 from ..meta import MetaField
-from ..formatters import calc_model_hash, calc_unet_hash, calc_vae_hash
+from ..formatters import calc_model_hash, calc_unet_hash, calc_vae_hash, deferred
 
 def _cdh_extract_ckpt(selection_data, input_data=None):
     try:
@@ -19,6 +19,7 @@ def _cdh_extract_ckpt(selection_data, input_data=None):
     except Exception:
         return ""
 
+@deferred
 def _cdh_calc_model_hash(selection_data, input_data=None):
     name = _cdh_extract_ckpt(selection_data, input_data)
     if not name:
@@ -53,6 +54,7 @@ def _cdh_extract_vae(selection_data, input_data=None):
     except Exception:
         return ""
 
+@deferred
 def _cdh_calc_vae_hash(selection_data, input_data=None):
     name = _cdh_extract_vae(selection_data, input_data)
     if not name:
@@ -1,5 +1,5 @@
 from ..meta import MetaField
-from ..formatters import calc_model_hash, calc_vae_hash
+from ..formatters import calc_model_hash, calc_vae_hash, LazyValue
 
 try:
     from ..formatters import calc_clip_hash
@@ -17,7 +17,7 @@ def get_model_hash(node_id, obj, prompt, extra_data, outputs, input_data):
     """Returns the hash of the primary model file."""
     model_name = get_model_name(node_id, obj, prompt, extra_data, outputs, input_data)
     if model_name:
-        return calc_model_hash(model_name)
+        return LazyValue(calc_model_hash, model_name)
     return None
 
 def get_vae_name(node_id, obj, prompt, extra_data, outputs, input_data):
@@ -30,7 +30,7 @@ def get_vae_hash(node_id, obj, prompt, extra_data, outputs, input_data):
     """Returns the separate VAE hash, ONLY in separate_components mode."""
     vae_name = get_vae_name(node_id, obj, prompt, extra_data, outputs, input_data)
     if vae_name:
-        return calc_vae_hash(vae_name)
+        return LazyValue(calc_vae_hash, vae_name)
     return None
 
 def get_clip_names(node_id, obj, prompt, extra_data, outputs, input_data):
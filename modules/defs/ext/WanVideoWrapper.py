@@ -1,12 +1,13 @@
 # https://github.com/kijai/ComfyUI-WanVideoWrapper
 
 from ..meta import MetaField
-from ..formatters import calc_lora_hash, calc_vae_hash, calc_model_hash, convert_skip_clip
+from ..formatters import calc_lora_hash, calc_vae_hash, calc_model_hash, convert_skip_clip, LazyValue, deferred
 
 # -------------------------------------------------------------------
 # Helpers for safe hashing (skip None, "", "none")
 # -------------------------------------------------------------------
 
+@deferred
 def get_wan_model_hash(path, _input_data=None):
     if not path or (isinstance(path, str) and path.strip().lower() == "none"):
         return None
@@ -15,6 +16,7 @@ def get_wan_model_hash(path, _input_data=None):
     except Exception:
         return None
 
+@deferred
 def get_wan_vae_hash(path, _input_data=None):
     if not path or (isinstance(path, str) and path.strip().lower() == "none"):
         return None
@@ -23,6 +25,7 @@ def get_wan_vae_hash(path, _input_data=None):
     except Exception:
         return None
 
+@deferred
 def get_wan_lora_hash(path, input_data=None):
     if not path or (isinstance(path, str) and path.strip().lower() == "none"):
         return None
@@ -154,21 +157,15 @@ def get_wan_lora_stack_from_inputs(input_data):
         results.append((name, strength, None))
     return results
 
-def get_wan_lora_model_names(node_id, obj, prompt, extra_data, outputs, input_data):
+def extract_wan_lora_select_multi(node_id, obj, prompt, extra_data, outputs, input_data):
+    """Parse the LoRA stack once and return every LoRA MetaField."""
     stack = get_wan_lora_stack_from_inputs(input_data)
-    return [entry[0] for entry in stack]
-
-def get_wan_lora_model_hashes(node_id, obj, prompt, extra_data, outputs, input_data):
-    names = get_wan_lora_model_names(node_id, obj, prompt, extra_data, outputs, input_data)
-    return [get_wan_lora_hash(n, input_data) if n else None for n in names]
-
-def get_wan_lora_strength_model(node_id, obj, prompt, extra_data, outputs, input_data):
-    stack = get_wan_lora_stack_from_inputs(input_data)
-    return [entry[1] for entry in stack]
-
-def get_wan_lora_strength_clip(node_id, obj, prompt, extra_data, outputs, input_data):
-    stack = get_wan_lora_stack_from_inputs(input_data)
-    return [entry[2] for entry in stack]
+    return {
+        MetaField.LORA_MODEL_NAME: [entry[0] for entry in stack],
+        MetaField.LORA_MODEL_HASH: [LazyValue(get_wan_lora_hash, entry[0], input_data) if entry[0] else None for entry in stack],
+        MetaField.LORA_STRENGTH_MODEL: [entry[1] for entry in stack],
+        MetaField.LORA_STRENGTH_CLIP: [entry[2] for entry in stack],
+    }
 
 # -------------------------------------------------------------------
 # SAMPLERS mapping
@@ -197,12 +194,6 @@ CAPTURE_FIELD_LIST = {
         MetaField.VAE_NAME: {"field_name": "model_name"},
         MetaField.VAE_HASH: {"field_name": "model_name", "format": get_wan_vae_hash},
     },
-    "WanVideoLoraSelectMulti": {
-        MetaField.LORA_MODEL_NAME: {"selector": get_wan_lora_model_names},
-        MetaField.LORA_MODEL_HASH: {"selector": get_wan_lora_model_hashes},
-        MetaField.LORA_STRENGTH_MODEL: {"selector": get_wan_lora_strength_model},
-        MetaField.LORA_STRENGTH_CLIP: {"selector": get_wan_lora_strength_clip},
-    },
     "WanVideoSampler": {
         MetaField.SEED: {"field_name": "seed"},
         MetaField.STEPS: {"field_name": "steps"},
@@ -211,3 +202,11 @@ CAPTURE_FIELD_LIST = {
         MetaField.DENOISE: {"field_name": "denoise_strength"},
     },
 }
+
+# -------------------------------------------------------------------
+# NODE_EXTRACTORS (each parses its node once for all MetaFields)
+# -------------------------------------------------------------------
+
+NODE_EXTRACTORS = {
+    "WanVideoLoraSelectMulti": extract_wan_lora_select_multi,
+}
@@ -1,6 +1,6 @@
 # https://github.com/pythongosssss/ComfyUI-Custom-Scripts
 from ..meta import MetaField
-from ..formatters import calc_lora_hash, calc_model_hash
+from ..formatters import calc_lora_hash, calc_model_hash, LazyValue
 
 
 def get_lora_model_name_stack(node_id, obj, prompt, extra_data, outputs, input_data):
@@ -9,7 +9,7 @@ def get_lora_model_name_stack(node_id, obj, prompt, extra_data, outputs, input_d
 
 def get_lora_model_hash_stack(node_id, obj, prompt, extra_data, outputs, input_data):
     return [
-        calc_lora_hash(model_name, input_data)
+        LazyValue(calc_lora_hash, model_name, input_data)
         for model_name in get_lora_data_stack(input_data, "lora")
     ]
 
@@ -1,124 +1,75 @@
 # https://github.com/yolain/ComfyUI-Easy-Use
 from ..meta import MetaField
-from ..formatters import calc_model_hash, calc_lora_hash, calc_vae_hash, convert_skip_clip, extract_embedding_hashes, extract_embedding_names
-import re
+from ..formatters import calc_model_hash, calc_lora_hash, calc_vae_hash, convert_skip_clip, extract_embedding_hashes, extract_embedding_names, LazyValue
 
 
-def get_embedding_names(node_id, obj, prompt, extra_data, outputs, input_data):
-    embedding_names = extract_embedding_names(input_data[0]["positive"][0])
-    embedding_names += extract_embedding_names(input_data[0]["negative"][0])
-
-    return embedding_names
-
-
-def get_embedding_hashes(node_id, obj, prompt, extra_data, outputs, input_data):
-    embedding_hashes = extract_embedding_hashes(input_data[0]["positive"][0])
-    embedding_hashes += extract_embedding_hashes(input_data[0]["negative"][0])
-
-    return embedding_hashes
-
-
-def get_lora_model_names(node_id, obj, prompt, extra_data, outputs, input_data):
-    lora_name = input_data[0]["lora_name"]
-
-    lora_names = []
-
-    # check against 'lora_name': ['None']
-    if lora_name[0] != "None":
-        lora_names.append(lora_name[0])
-
-    # 'optional_lora_stack': [[('Style/Smooth_Booster_v3.safetensors', 0.3, 0.6)]]
-    if "optional_lora_stack" in input_data[0]:
-        optional_lora_stack = input_data[0]["optional_lora_stack"][0]
-        for lora in optional_lora_stack:
-            lora_names.append(lora[0])
-
-    return lora_names
-
-
-def get_lora_model_hashes(node_id, obj, prompt, extra_data, outputs, input_data):
-    lora_names = get_lora_model_names(node_id, obj, prompt, extra_data, outputs, input_data)
-
-    lora_hashes = []
-
-    for name in lora_names:
-        lora_hashes.append(calc_lora_hash(name))
-
-    return lora_hashes
-
-
-def get_lora_strengths(node_id, obj, prompt, extra_data, outputs, input_data):
-    lora_strengths = []
+def get_lora_stack_from_loader(input_data):
+    """Parse the LoRAs of an 'easy fullLoader' node once: [(name, model_strength, clip_strength), ...]"""
+    lora_stack = []
 
     # check against 'lora_name': ['None']
     if input_data[0]["lora_name"][0] != "None":
-        lora_strengths.append(input_data[0]["lora_model_strength"][0])
+        lora_stack.append((
+            input_data[0]["lora_name"][0],
+            input_data[0]["lora_model_strength"][0],
+            input_data[0]["lora_clip_strength"][0],
+        ))
 
     # 'optional_lora_stack': [[('Style/Smooth_Booster_v3.safetensors', 0.3, 0.6)]]
     if "optional_lora_stack" in input_data[0]:
-        optional_lora_stack = input_data[0]["optional_lora_stack"][0]
-        for lora in optional_lora_stack:
-            lora_strengths.append(lora[1])
-
-    return lora_strengths
+        for lora in input_data[0]["optional_lora_stack"][0]:
+            lora_stack.append((lora[0], lora[1], lora[2]))
 
+    return lora_stack
 
-def get_lora_clip_strengths(node_id, obj, prompt, extra_data, outputs, input_data):
-    lora_clip_strengths = []
-
-    # check against 'lora_name': ['None']
-    if input_data[0]["lora_name"][0] != "None":
-        lora_clip_strengths.append(input_data[0]["lora_clip_strength"][0])
-
-    # 'optional_lora_stack': [[('Style/Smooth_Booster_v3.safetensors', 0.3, 0.6)]]
-    if "optional_lora_stack" in input_data[0]:
-        optional_lora_stack = input_data[0]["optional_lora_stack"][0]
-        for lora in optional_lora_stack:
-            lora_clip_strengths.append(lora[2])
 
-    return lora_clip_strengths
-
-
-def get_lora_model_name_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    toggled_on = input_data[0]["toggle"][0]
-    
-    if toggled_on:
-        return get_lora_data_stack(input_data, "lora_\d_name")
-    else:
+def get_lora_stack(input_data):
+    """Parse an 'easy loraStack' node once: [(name, model_strength, clip_strength), ...]"""
+    if not input_data[0]["toggle"][0]:
         return []
 
-
-def get_lora_model_hash_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    return [
-        calc_lora_hash(model_name, input_data)
-        for model_name in get_lora_data_stack(input_data, "lora_\d_name")
-    ]
+    advanced = input_data[0]["mode"][0] == "advanced"
+    lora_stack = []
+    for i in range(1, input_data[0]["num_loras"][0] + 1):
+        name = input_data[0].get(f"lora_{i}_name", [None])[0]
+        if name in (None, "None"):
+            continue
+        if advanced:
+            model_strength = input_data[0][f"lora_{i}_model_strength"][0]
+            clip_strength = input_data[0][f"lora_{i}_clip_strength"][0]
+        else:
+            model_strength = clip_strength = input_data[0][f"lora_{i}_strength"][0]
+        lora_stack.append((name, model_strength, clip_strength))
+
+    return lora_stack
+
+
+def lora_stack_fields(lora_stack):
+    return {
+        MetaField.LORA_MODEL_NAME: [name for name, _, _ in lora_stack],
+        MetaField.LORA_MODEL_HASH: [LazyValue(calc_lora_hash, name) for name, _, _ in lora_stack],
+        MetaField.LORA_STRENGTH_MODEL: [model for _, model, _ in lora_stack],
+        MetaField.LORA_STRENGTH_CLIP: [clip for _, _, clip in lora_stack],
+    }
 
 
-def get_lora_strength_model_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    if input_data[0]["mode"][0] == "advanced":
-        return get_lora_data_stack(input_data, "lora_\d_model_strength")
-    return get_lora_data_stack(input_data, "lora_\d_strength")
+def extract_full_loader(node_id, obj, prompt, extra_data, outputs, input_data):
+    fields = lora_stack_fields(get_lora_stack_from_loader(input_data))
 
+    texts = (input_data[0]["positive"][0], input_data[0]["negative"][0])
+    fields[MetaField.EMBEDDING_NAME] = [name for text in texts for name in extract_embedding_names(text)]
+    fields[MetaField.EMBEDDING_HASH] = [h for text in texts for h in extract_embedding_hashes(text)]
 
-def get_lora_strength_clip_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    if input_data[0]["mode"][0] == "advanced":
-        return get_lora_data_stack(input_data, "lora_\d_clip_strength")
-    return get_lora_data_stack(input_data, "lora_\d_strength")
+    return fields
 
 
-def get_lora_data_stack(input_data, attribute):
-    lora_count = input_data[0]["num_loras"][0]
-    return [
-        v[0]
-        for k, v in input_data[0].items()
-        if re.search(attribute, k) != None and v[0] != "None"
-    ][:lora_count]
+def extract_lora_stack(node_id, obj, prompt, extra_data, outputs, input_data):
+    return lora_stack_fields(get_lora_stack(input_data))
 
 
 def get_lora_model_hash(node_id, obj, prompt, extra_data, outputs, input_data):
     if input_data[0]["lora_name"][0] != "None":
-        return calc_lora_hash(input_data[0]["lora_name"][0], input_data)
+        return LazyValue(calc_lora_hash, input_data[0]["lora_name"][0], input_data)
     else:
         return ""
 
@@ -167,14 +118,8 @@ CAPTURE_FIELD_LIST = {
         MetaField.CLIP_SKIP: {"field_name": "clip_skip", "format": convert_skip_clip},
         MetaField.POSITIVE_PROMPT: {"field_name": "positive"},
         MetaField.NEGATIVE_PROMPT: {"field_name": "negative"},
-        MetaField.EMBEDDING_NAME: {"selector": get_embedding_names},
-        MetaField.EMBEDDING_HASH: {"selector": get_embedding_hashes},
         MetaField.IMAGE_WIDTH: {"field_name": "empty_latent_width"},
         MetaField.IMAGE_HEIGHT: {"field_name": "empty_latent_height"},
-        MetaField.LORA_MODEL_NAME: {"selector": get_lora_model_names},
-        MetaField.LORA_MODEL_HASH: {"selector": get_lora_model_hashes},
-        MetaField.LORA_STRENGTH_MODEL: {"selector": get_lora_strengths},
-        MetaField.LORA_STRENGTH_CLIP: {"selector": get_lora_clip_strengths},
     },
     "easy comfyLoader": {
         MetaField.MODEL_NAME: {"field_name": "ckpt_name"},
@@ -252,10 +197,10 @@ CAPTURE_FIELD_LIST = {
         MetaField.SAMPLER_NAME: {"field_name": "sampler_name"},
         MetaField.SCHEDULER: {"field_name": "scheduler"},
     },
-    "easy loraStack": {
-        MetaField.LORA_MODEL_NAME: {"selector": get_lora_model_name_stack},
-        MetaField.LORA_MODEL_HASH: {"selector": get_lora_model_hash_stack},
-        MetaField.LORA_STRENGTH_MODEL: {"selector": get_lora_strength_model_stack},
-        MetaField.LORA_STRENGTH_CLIP: {"selector": get_lora_strength_clip_stack},
-    },
+}
+
+# Each extractor parses its node once and returns all of its MetaFields
+NODE_EXTRACTORS = {
+    "easy fullLoader": extract_full_loader,
+    "easy loraStack": extract_lora_stack,
 }
\ No newline at end of file
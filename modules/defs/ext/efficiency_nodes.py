@@ -1,40 +1,33 @@
 # https://github.com/jags111/efficiency-nodes-comfyui
 from ..meta import MetaField
-from ..formatters import calc_model_hash, calc_lora_hash, convert_skip_clip
+from ..formatters import calc_model_hash, calc_lora_hash, convert_skip_clip, LazyValue
 
 
-def get_lora_model_name_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    return get_lora_data_stack(input_data, "lora_name")
+def get_lora_stack(input_data):
+    """Parse a 'LoRA Stacker' node once: [(name, model_strength, clip_strength), ...]"""
+    advanced = input_data[0]["input_mode"][0] == "advanced"
+    lora_stack = []
+    for i in range(1, input_data[0]["lora_count"][0] + 1):
+        name = input_data[0].get(f"lora_name_{i}", [None])[0]
+        if name in (None, "None"):
+            continue
+        if advanced:
+            model_strength = input_data[0][f"model_str_{i}"][0]
+            clip_strength = input_data[0][f"clip_str_{i}"][0]
+        else:
+            model_strength = clip_strength = input_data[0][f"lora_wt_{i}"][0]
+        lora_stack.append((name, model_strength, clip_strength))
+    return lora_stack
 
 
-def get_lora_model_hash_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    return [
-        calc_lora_hash(model_name, input_data)
-        for model_name in get_lora_data_stack(input_data, "lora_name")
-    ]
-
-
-def get_lora_strength_model_stack(
-    node_id, obj, prompt, extra_data, outputs, input_data
-):
-    if input_data[0]["input_mode"][0] == "advanced":
-        return get_lora_data_stack(input_data, "model_str")
-    return get_lora_data_stack(input_data, "lora_wt")
-
-
-def get_lora_strength_clip_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    if input_data[0]["input_mode"][0] == "advanced":
-        return get_lora_data_stack(input_data, "clip_str")
-    return get_lora_data_stack(input_data, "lora_wt")
-
-
-def get_lora_data_stack(input_data, attribute):
-    lora_count = input_data[0]["lora_count"][0]
-    return [
-        v[0]
-        for k, v in input_data[0].items()
-        if k.startswith(attribute) and v[0] != "None"
-    ][:lora_count]
+def extract_lora_stacker(node_id, obj, prompt, extra_data, outputs, input_data):
+    lora_stack = get_lora_stack(input_data)
+    return {
+        MetaField.LORA_MODEL_NAME: [name for name, _, _ in lora_stack],
+        MetaField.LORA_MODEL_HASH: [LazyValue(calc_lora_hash, name, input_data) for name, _, _ in lora_stack],
+        MetaField.LORA_STRENGTH_MODEL: [model for _, model, _ in lora_stack],
+        MetaField.LORA_STRENGTH_CLIP: [clip for _, _, clip in lora_stack],
+    }
 
 
 SAMPLERS = {
@@ -106,10 +99,9 @@ CAPTURE_FIELD_LIST = {
         MetaField.SAMPLER_NAME: {"field_name": "sampler_name"},
         MetaField.SCHEDULER: {"field_name": "scheduler"},
     },
-    "LoRA Stacker": {
-        MetaField.LORA_MODEL_NAME: {"selector": get_lora_model_name_stack},
-        MetaField.LORA_MODEL_HASH: {"selector": get_lora_model_hash_stack},
-        MetaField.LORA_STRENGTH_MODEL: {"selector": get_lora_strength_model_stack},
-        MetaField.LORA_STRENGTH_CLIP: {"selector": get_lora_strength_clip_stack},
-    },
+}
+
+# Each extractor parses its node once and returns all of its MetaFields
+NODE_EXTRACTORS = {
+    "LoRA Stacker": extract_lora_stacker,
 }
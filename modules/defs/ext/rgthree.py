@@ -1,65 +1,45 @@
 # https://github.com/rgthree/rgthree-comfy
 from ..meta import MetaField
-from ..formatters import calc_lora_hash
+from ..formatters import calc_lora_hash, LazyValue
 
 
-def get_lora_model_name(node_id, obj, prompt, extra_data, outputs, input_data):
-    return get_lora_data(input_data, "lora")
-
-
-def get_lora_model_hash(node_id, obj, prompt, extra_data, outputs, input_data):
+def get_power_lora_stack(input_data):
+    """Parse a 'Power Lora Loader' node once: [(name, strength), ...] of the enabled LoRAs."""
     return [
-        calc_lora_hash(model_name, input_data)
-        for model_name in get_lora_data(input_data, "lora")
+        (v[0]["lora"], v[0]["strength"])
+        for k, v in input_data[0].items()
+        if k.startswith("lora_") and isinstance(v[0], dict) and v[0]["on"]
     ]
 
 
-def get_lora_strength(node_id, obj, prompt, extra_data, outputs, input_data):
-    return get_lora_data(input_data, "strength")
-
-
-def get_lora_data(input_data, attribute):
+def get_lora_stack(input_data):
+    """Parse a 'Lora Loader Stack' node once: [(name, strength), ...], pairing lora_XX with strength_XX."""
     return [
-        v[0][attribute]
+        (v[0], input_data[0].get("strength_" + k[len("lora_"):], [None])[0])
         for k, v in input_data[0].items()
-        if k.startswith("lora_") and v[0]["on"]
+        if k.startswith("lora_") and v[0] != "None"
     ]
 
 
-def get_lora_model_name_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    return get_lora_data_stack(input_data, "lora")
-
-
-def get_lora_model_hash_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    return [
-        calc_lora_hash(model_name, input_data)
-        for model_name in get_lora_data_stack(input_data, "lora")
-    ]
+def lora_stack_fields(lora_stack, input_data):
+    return {
+        MetaField.LORA_MODEL_NAME: [name for name, _ in lora_stack],
+        MetaField.LORA_MODEL_HASH: [LazyValue(calc_lora_hash, name, input_data) for name, _ in lora_stack],
+        MetaField.LORA_STRENGTH_MODEL: [strength for _, strength in lora_stack],
+        MetaField.LORA_STRENGTH_CLIP: [strength for _, strength in lora_stack],
+    }
 
 
-def get_lora_strength_stack(node_id, obj, prompt, extra_data, outputs, input_data):
-    return get_lora_data_stack(input_data, "strength")
+def extract_power_lora_loader(node_id, obj, prompt, extra_data, outputs, input_data):
+    return lora_stack_fields(get_power_lora_stack(input_data), input_data)
 
 
-def get_lora_data_stack(input_data, attribute):
-    return [
-        v[0]
-        for k, v in input_data[0].items()
-        if k.startswith(attribute + "_") and v[0] != "None"
-    ]
+def extract_lora_loader_stack(node_id, obj, prompt, extra_data, outputs, input_data):
+    return lora_stack_fields(get_lora_stack(input_data), input_data)
 
 
-CAPTURE_FIELD_LIST = {
-    "Power Lora Loader (rgthree)": {
-        MetaField.LORA_MODEL_NAME: {"selector": get_lora_model_name},
-        MetaField.LORA_MODEL_HASH: {"selector": get_lora_model_hash},
-        MetaField.LORA_STRENGTH_MODEL: {"selector": get_lora_strength},
-        MetaField.LORA_STRENGTH_CLIP: {"selector": get_lora_strength},
-    },
-    "Lora Loader Stack (rgthree)": {
-        MetaField.LORA_MODEL_NAME: {"selector": get_lora_model_name_stack},
-        MetaField.LORA_MODEL_HASH: {"selector": get_lora_model_hash_stack},
-        MetaField.LORA_STRENGTH_MODEL: {"selector": get_lora_strength_stack},
-        MetaField.LORA_STRENGTH_CLIP: {"selector": get_lora_strength_stack},
-    },
+# Each extractor parses its node once and returns all of its MetaFields
+NODE_EXTRACTORS = {
+    "Power Lora Loader (rgthree)": extract_power_lora_loader,
+    "Lora Loader Stack (rgthree)": extract_lora_loader_stack,
 }
@@ -1,31 +1,37 @@
-import re
-import folder_paths
 from ..utils.hash import calc_hash
 from ..utils.embedding import get_embedding_file_path
+from ..utils.model_index import resolve_model_path
+from ..utils.lazy import LazyValue, deferred
+from ..utils.prompt_text import analyze_prompt
 
 cache_model_hash = {}
 
 # Generalized hash calculation for different folder types
 def calc_hash_for_type(folder_type, model_name):
     try:
-        filename = folder_paths.get_full_path(folder_type, model_name)
+        filename = resolve_model_path(folder_type, model_name)
         return calc_hash(filename)
     except Exception as e:
         return ""  # Return empty string if unable to calculate hash
 
 # Replacing calc_model_hash, calc_vae_hash, calc_lora_hash, and calc_unet_hash
+@deferred
 def calc_model_hash(model_name, input_data=None):
     return calc_hash_for_type("checkpoints", model_name)
 
+@deferred
 def calc_vae_hash(model_name, input_data=None):
     return calc_hash_for_type("vae", model_name)
 
+@deferred
 def calc_lora_hash(model_name, input_data=None):
     return calc_hash_for_type("loras", model_name)
 
+@deferred
 def calc_unet_hash(model_name, input_data=None):
     return calc_hash_for_type("unet", model_name)
 
+@deferred
 def calc_upscale_hash(model_name, input_data=None):
     return calc_hash_for_type("upscale_models", model_name)
 
@@ -45,15 +51,15 @@ def get_scaled_height(scaled_by, input_data):
     return round(samples.shape[2] * scaled_by * SCALING_FACTOR)
 
 
-embedding_pattern = re.compile(r"embedding:\(?([^\s),]+)\)?")
-
-def _extract_embedding_names_from_text(text):
-    return [match.group(1) for match in embedding_pattern.finditer(text)] if "embedding:" in text else []
-
 def extract_embedding_names(text, input_data=None):
-    return _extract_embedding_names_from_text(text)
+    if not isinstance(text, str):
+        return []
+    return list(analyze_prompt(text).embedding_names)
+
+def calc_embedding_hash(name, input_data=None):
+    return calc_hash(get_embedding_file_path(name)) or ""
 
 def extract_embedding_hashes(text, input_data=None):
+    # One lazy hash per embedding, so names and hashes still line up
     names = extract_embedding_names(text)
-    hashes = [calc_hash(get_embedding_file_path(name)) or "" for name in names]
-    return hashes
+    return [LazyValue(calc_embedding_hash, name) for name in names]
@@ -0,0 +1,136 @@
+# Multilingual keywords used to classify prompt nodes by their title
+from collections import deque
+from functools import lru_cache
+
+
+POSITIVE_KEYWORDS = [
+    # 中文
+    "正面", "积极", "正向",
+    # English
+    "positive", "positives", "front", "frontal",
+    # French
+    "positif", "positive", "positifs", "positives",
+    # German
+    "positiv",
+    # Spanish / Portuguese / Italian
+    "positivo", "positiva", "positivos", "positivas",
+    # Russian
+    "позитивный", "позитивная", "позитивные",
+    "положительный", "положительная", "положительные",
+    # Japanese
+    "ポジティブ", "前面",
+    # Korean
+    "긍정", "전면",
+    # Arabic
+    "إيجابي", "إيجابية",
+    # Hindi
+    "सकारात्मक",
+    # Indonesian / Malay
+    "positif", "positifnya",
+    # Thai
+    "เชิงบวก", "บวก",
+    # Vietnamese
+    "tích cực", "tích-cực",
+]
+
+NEGATIVE_KEYWORDS = [
+    # 中文
+    "负面", "消极", "否定", "负向", "负面的",
+    # English
+    "negative", "negatives", "bad", "adverse", "unfavorable",
+    # French
+    "négatif", "négative", "négatifs", "négatives", "défavorable",
+    # German
+    "negativ", "schlecht", "nachteilig",
+    # Spanish / Portuguese / Italian
+    "negativo", "negativa", "negativos", "negativas", "desfavorable", "desfavorável",
+    "negative",  # Italian plural feminine
+    # Russian
+    "негативный", "негативная", "негативные",
+    "отрицательный", "отрицательная", "отрицательные",
+    "плохой",
+    # Japanese
+    "ネガティブ", "否定的", "マイナス", "悪い",
+    # Korean
+    "부정", "부정적", "마이너스", "나쁜",
+    # Arabic
+    "سلبي", "سلبية", "غير موات", "سيئ",
+    # Hindi
+    "नकारात्मक", "बुरा",
+    # Indonesian / Malay
+    "negatif", "buruk", "kurang baik",
+    # Thai
+    "เชิงลบ", "ลบ", "ไม่ดี",
+    # Vietnamese
+    "tiêu cực", "tiêu-cực", "xấu",
+]
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over casefolded keywords grouped by label.
+
+    `match(text)` returns the labels of every keyword found in `text` in a
+    single linear scan, including overlapping matches. Results are cached per text.
+    """
+
+    def __init__(self, keywords_by_label, cache_size=1024):
+        goto, fail, outputs = [{}], [0], [set()]
+
+        for label, keywords in keywords_by_label.items():
+            for keyword in keywords:
+                state = 0
+                for ch in keyword.casefold():
+                    next_state = goto[state].get(ch)
+                    if next_state is None:
+                        next_state = len(goto)
+                        goto[state][ch] = next_state
+                        goto.append({})
+                        fail.append(0)
+                        outputs.append(set())
+                    state = next_state
+                outputs[state].add(label)
+
+        # Breadth-first pass to link each state to its longest proper suffix state
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                if state:
+                    fallback = fail[state]
+                    while fallback and ch not in goto[fallback]:
+                        fallback = fail[fallback]
+                    fail[next_state] = goto[fallback].get(ch, 0)
+                outputs[next_state] |= outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [frozenset(labels) for labels in outputs]
+        self._labels = frozenset(keywords_by_label)
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, text):
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set()
+        state = 0
+        for ch in text.casefold():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+                if found == self._labels:
+                    break
+        return frozenset(found)
+
+
+TITLE_MATCHER = KeywordMatcher({"positive": POSITIVE_KEYWORDS, "negative": NEGATIVE_KEYWORDS})
+
+
+def is_positive_title(title: str) -> bool:
+    return "positive" in TITLE_MATCHER.match(title)
+
+
+def is_negative_title(title: str) -> bool:
+    return "negative" in TITLE_MATCHER.match(title)
@@ -1,17 +1,156 @@
 import os
+import ast
 import glob
+import json
+import time
 import importlib
+import threading
 
-def load_extensions(ext_folder: str, target_package: str, capture_dict: dict, sampler_dict: dict):
-    for module_path in glob.glob(os.path.join(ext_folder, "*.py")):
+from ..config import NODE_CACHE_DIR
+
+MANIFEST_FILE = os.path.join(NODE_CACHE_DIR, "ext_manifest.json")
+REGISTRY_NAMES = ("CAPTURE_FIELD_LIST", "SAMPLERS", "NODE_EXTRACTORS")
+SCANNER_VERSION = 2  # Bump when scan_class_types changes, so cached manifests are rescanned
+
+
+def scan_class_types(module_path):
+    """
+    Read the class_types an ext module registers without importing it.
+    Returns the literal string keys of its CAPTURE_FIELD_LIST / SAMPLERS / NODE_EXTRACTORS dicts,
+    or None if they can't be determined statically.
+    """
+    with open(module_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), module_path)
+
+    class_types = set()
+    for node in tree.body:
+        if not isinstance(node, ast.Assign):
+            continue
+        if not any(isinstance(t, ast.Name) and t.id in REGISTRY_NAMES for t in node.targets):
+            continue
+        if not isinstance(node.value, ast.Dict):
+            return None
+        for key in node.value.keys:
+            if not (isinstance(key, ast.Constant) and isinstance(key.value, str)):
+                return None
+            class_types.add(key.value)
+    return sorted(class_types)
+
+
+def build_manifest(ext_folder):
+    """
+    Map each ext module name to the class_types it covers.
+    Entries are cached in MANIFEST_FILE and rescanned only when the module file changes,
+    or when the cache was written by another scanner version or for other registry names.
+    """
+    cache_key = [SCANNER_VERSION, list(REGISTRY_NAMES)]
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cached = cache.get("modules", {}) if isinstance(cache, dict) and cache.get("key") == cache_key else {}
+
+    manifest = {}
+    for module_path in sorted(glob.glob(os.path.join(ext_folder, "*.py"))):
         module_name = os.path.splitext(os.path.basename(module_path))[0]
-        import_path = f"{target_package}.ext.{module_name}"
+        if module_name == "__init__":
+            continue
+        mtime = os.path.getmtime(module_path)
+        entry = cached.get(module_name)
+        if not entry or entry.get("mtime") != mtime:
+            try:
+                class_types = scan_class_types(module_path)
+            except (OSError, SyntaxError, ValueError):
+                class_types = None
+            entry = {"mtime": mtime, "class_types": class_types}
+        manifest[module_name] = entry
+
+    if manifest != cached:
+        try:
+            temp_file = MANIFEST_FILE + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump({"key": cache_key, "modules": manifest}, f, indent=2, ensure_ascii=False)
+            os.replace(temp_file, MANIFEST_FILE)
+        except OSError as e:
+            print(f"[MetadataExtension] Failed to write {MANIFEST_FILE}: {e}")
 
+    return manifest
+
+
+class ExtensionLoader:
+    """
+    Imports ext capture definitions on demand.
+
+    An ext module is imported the first time one of its class_types appears in a
+    prompt; until then it costs nothing at startup. Modules whose class_types
+    can't be read statically are imported eagerly.
+    """
+
+    def __init__(self, ext_folder: str, target_package: str, capture_dict: dict, sampler_dict: dict, extractor_dict: dict):
+        self.target_package = target_package
+        self.capture_dict = capture_dict
+        self.sampler_dict = sampler_dict
+        self.extractor_dict = extractor_dict
+        self.manifest = build_manifest(ext_folder)
+        self.load_times = {}  # module name -> import time in ms
+        self.version = 0  # Bumped whenever a module adds definitions
+        self._loaded = set()
+        self._seen_class_types = set()
+        self._lock = threading.RLock()
+
+        self._modules_by_class_type = {}
+        for module_name, entry in self.manifest.items():
+            for class_type in entry["class_types"] or ():
+                self._modules_by_class_type.setdefault(class_type, []).append(module_name)
+
+        for module_name, entry in self.manifest.items():
+            if entry["class_types"] is None:
+                self._load(module_name)
+
+    def _load(self, module_name):
+        """Import an ext module and merge its definitions. Returns the class_types it registered."""
+        self._loaded.add(module_name)
+        import_path = f"{self.target_package}.ext.{module_name}"
+        start = time.perf_counter()
         try:
             module = importlib.import_module(import_path)
             if hasattr(module, "CAPTURE_FIELD_LIST"):
-                capture_dict.update(module.CAPTURE_FIELD_LIST)
+                self.capture_dict.update(module.CAPTURE_FIELD_LIST)
             if hasattr(module, "SAMPLERS"):
-                sampler_dict.update(module.SAMPLERS)
+                self.sampler_dict.update(module.SAMPLERS)
+            if hasattr(module, "NODE_EXTRACTORS"):
+                self.extractor_dict.update(module.NODE_EXTRACTORS)
         except Exception as e:
             print(f"[MetadataExtension] Failed to load {import_path}: {e}")
+            return set()
+        self.version += 1
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.load_times[module_name] = elapsed_ms
+        print(f"[MetadataExtension] Loaded {import_path} in {elapsed_ms:.1f} ms")
+        return {
+            class_type
+            for name in REGISTRY_NAMES
+            for class_type in getattr(module, name, {})
+        }
+
+    def ensure_loaded(self, class_types):
+        """
+        Import every ext module covering one of `class_types` that isn't loaded yet.
+        Returns the class_types the imported modules registered.
+        """
+        new_class_types = set(class_types) - self._seen_class_types
+        loaded = set()
+        if not new_class_types:
+            return loaded
+        with self._lock:
+            for class_type in new_class_types:
+                for module_name in self._modules_by_class_type.get(class_type, ()):
+                    if module_name not in self._loaded:
+                        loaded |= self._load(module_name)
+            self._seen_class_types |= new_class_types
+        return loaded
+
+    def get_load_report(self):
+        """Import time in ms of every loaded ext module, slowest first."""
+        return dict(sorted(self.load_times.items(), key=lambda item: item[1], reverse=True))
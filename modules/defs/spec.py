@@ -0,0 +1,396 @@
+"""
+Declarative capture definitions.
+
+Spec files (JSON, or TOML on Python 3.11+) in the `specs` folder describe capture
+rules without Python code. They are compiled once into CAPTURE_FIELD_LIST
+entries and reloaded whenever a file changes, without restarting ComfyUI:
+
+    {
+        "samplers": {"MySampler": {"positive": "positive", "negative": "negative"}},
+        "captures": {
+            "MyLoader": {
+                "MODEL_NAME": {"field": "ckpt_name"},
+                "MODEL_HASH": {"field": "ckpt_name", "format": "calc_model_hash"},
+                "LORA_MODEL_NAME": {"stack": "lora_{i}_name", "count": "num_loras", "skip": ["None"]},
+                "LORA_STRENGTH_MODEL": {
+                    "switch": "mode",
+                    "cases": {"advanced": {"stack": "lora_{i}_model_strength"}},
+                    "default": {"stack": "lora_{i}_strength"}
+                },
+                "LORA_STRENGTH_CLIP": {"field": "loras", "path": ["__value__"], "each": "clip"}
+            }
+        }
+    }
+
+Field keys are MetaField names.
+A field descriptor is one of:
+  - "value": a constant.
+  - "field": an input name, optionally followed by "path" (keys/indices to descend
+    into the value) and "each" (a key to read from every item of a list value).
+  - "stack": an input name pattern with an "{i}" placeholder, starting at "start"
+    (default 1), keeping at most "count" (an input name) values.
+  - "switch": an input name whose value picks a descriptor from "cases", or "default".
+Any descriptor may also set "toggle" (an input that must be truthy), "skip"
+(values to drop), "suffix" (text appended to every value, e.g. a file extension),
+"format" (a FORMATTERS name) and "validate" (a VALIDATORS name).
+
+Spec fields are layered over the core and ext rules of the same class_type: they add or
+override single fields, and the original rules come back when the spec is edited or removed.
+"""
+import os
+import json
+import threading
+import time
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+from .meta import MetaField
+from .validators import is_positive_prompt, is_negative_prompt
+from .formatters import (
+    calc_model_hash,
+    calc_upscale_hash,
+    calc_vae_hash,
+    calc_lora_hash,
+    calc_unet_hash,
+    convert_skip_clip,
+    get_scaled_width,
+    get_scaled_height,
+    extract_embedding_names,
+    extract_embedding_hashes,
+)
+from ..utils.lazy import LazyValue
+from ..utils.log import print_warning
+
+SPEC_DIR = os.path.join(os.path.dirname(__file__), "specs")
+SPEC_EXTENSIONS = (".json", ".toml") if tomllib else (".json",)
+RELOAD_INTERVAL = 1.0  # Seconds between spec folder checks
+MAX_STACK_SIZE = 64
+
+FORMATTERS = {
+    func.__name__: func
+    for func in (
+        calc_model_hash,
+        calc_upscale_hash,
+        calc_vae_hash,
+        calc_lora_hash,
+        calc_unet_hash,
+        convert_skip_clip,
+        get_scaled_width,
+        get_scaled_height,
+        extract_embedding_names,
+        extract_embedding_hashes,
+    )
+}
+
+VALIDATORS = {
+    func.__name__: func
+    for func in (is_positive_prompt, is_negative_prompt)
+}
+
+DESCRIPTOR_KEYS = {"value", "field", "stack", "switch"}
+
+
+class SpecError(ValueError):
+    pass
+
+
+def _unwrap(value):
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _lookup(registry, kind, name):
+    if name is None:
+        return None
+    if name not in registry:
+        raise SpecError(f"unknown {kind} '{name}'")
+    return registry[name]
+
+
+def _compile_path(path):
+    """Compile a list of keys/indices into a function that descends into a value."""
+    path = tuple(path or ())
+
+    def descend(value):
+        for key in path:
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif isinstance(value, (list, tuple)) and isinstance(key, int) and -len(value) <= key < len(value):
+                value = value[key]
+            else:
+                return None
+        return value
+
+    return descend
+
+
+def _compile_values(desc):
+    """Compile the value source of a descriptor into `values(inputs) -> list`."""
+    if "field" in desc:
+        field = desc["field"]
+        descend = _compile_path(desc.get("path"))
+        each = desc.get("each")
+
+        def values(inputs):
+            value = descend(_unwrap(inputs.get(field)))
+            if value is None:
+                return []
+            if each is not None:
+                if not isinstance(value, (list, tuple)):
+                    return []
+                return [item.get(each) for item in value if isinstance(item, dict)]
+            return list(value) if isinstance(value, (list, tuple)) else [value]
+
+        return values
+
+    if "stack" in desc:
+        pattern = desc["stack"]
+        start = desc.get("start", 1)
+        count_field = desc.get("count")
+        skip = tuple(desc.get("skip", ()))
+        keys = tuple(pattern.format(i=i) for i in range(start, start + MAX_STACK_SIZE))
+
+        def values(inputs):
+            limit = _unwrap(inputs.get(count_field)) if count_field else None
+            result = []
+            for key in keys:
+                if key not in inputs:
+                    break
+                value = _unwrap(inputs[key])
+                if value in skip:
+                    continue
+                result.append(value)
+                if limit is not None and len(result) >= limit:
+                    break
+            return result
+
+        return values
+
+    raise SpecError(f"descriptor needs one of {sorted(DESCRIPTOR_KEYS)}")
+
+
+def _compile_selector(desc, name="select"):
+    """
+    Compile a descriptor into a selector with the usual ext selector signature.
+    `name` becomes its qualname, so the extractor guard tells spec fields apart.
+    """
+    if "switch" in desc:
+        switch_field = desc["switch"]
+        cases = {key: _compile_selector(case, name) for key, case in desc.get("cases", {}).items()}
+        default = _compile_selector(desc["default"], name) if "default" in desc else None
+
+        def select_case(node_id, obj, prompt, extra_data, outputs, input_data):
+            selector = cases.get(_unwrap(input_data[0].get(switch_field)), default)
+            return selector(node_id, obj, prompt, extra_data, outputs, input_data) if selector else None
+
+        select_case.__qualname__ = name
+        return select_case
+
+    values = _compile_values(desc)
+    toggle = desc.get("toggle")
+    skip = tuple(desc.get("skip", ()))
+    suffix = desc.get("suffix")
+    format_func = _lookup(FORMATTERS, "formatter", desc.get("format"))
+    is_deferred = getattr(format_func, "deferred", False)
+
+    def select(node_id, obj, prompt, extra_data, outputs, input_data):
+        inputs = input_data[0]
+        if toggle is not None and not _unwrap(inputs.get(toggle)):
+            return []
+        result = [v for v in values(inputs) if v is not None and v not in skip]
+        if suffix:
+            result = [f"{v}{suffix}" for v in result]
+        if format_func is None:
+            return result
+        if is_deferred:
+            return [LazyValue(format_func, v, input_data) for v in result]
+        return [format_func(v, input_data) for v in result]
+
+    select.__qualname__ = name
+    return select
+
+
+def compile_field(desc, name="select"):
+    """Compile one field descriptor into a CAPTURE_FIELD_LIST entry; `name` names its selector."""
+    if not isinstance(desc, dict) or not DESCRIPTOR_KEYS & desc.keys():
+        raise SpecError(f"descriptor needs one of {sorted(DESCRIPTOR_KEYS)}")
+
+    entry = {}
+    validate = _lookup(VALIDATORS, "validator", desc.get("validate"))
+    if validate:
+        entry["validate"] = validate
+
+    if "value" in desc:
+        entry["value"] = desc["value"]
+    elif "field" in desc and not {"path", "each", "toggle", "skip", "suffix"} & desc.keys():
+        # Plain field: use the native field_name path of Capture.get_inputs
+        entry["field_name"] = desc["field"]
+        format_func = _lookup(FORMATTERS, "formatter", desc.get("format"))
+        if format_func:
+            entry["format"] = format_func
+    else:
+        entry["selector"] = _compile_selector(desc, name)
+    return entry
+
+
+def _meta_key(name):
+    if name not in MetaField.__members__:
+        raise SpecError(f"unknown field '{name}'")
+    return MetaField[name]
+
+
+def compile_spec(spec, source="spec"):
+    """
+    Compile a parsed spec into (CAPTURE_FIELD_LIST, SAMPLERS) dicts. Selectors are named
+    "<source>.<field>" (source is the spec file name), so each field is timed and disabled
+    on its own by the extractor guard.
+    """
+    captures = {}
+    for class_type, fields in spec.get("captures", {}).items():
+        captures[class_type] = {
+            _meta_key(name): compile_field(desc, f"{source}.{name}") for name, desc in fields.items()
+        }
+    samplers = dict(spec.get("samplers", {}))
+    return captures, samplers
+
+
+def load_spec_file(path):
+    if path.endswith(".toml"):
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+    return compile_spec(spec, os.path.basename(path))
+
+
+_MISSING = object()
+
+
+class SpecLayer:
+    """
+    Overlays the entries of spec files on a registry dict without losing the entries they
+    cover. The entry a class_type had before the first spec touched it is kept as its base;
+    the registry holds the base with the spec fields merged in, and gets the base back once
+    no spec covers the class_type anymore. If something else (an ext module) replaces the
+    entry in the meantime, that entry becomes the new base.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self._base = {}  # class_type -> entry before the specs, or _MISSING
+        self._installed = {}  # class_type -> entry this layer put in the registry
+
+    def apply(self, class_type, entries):
+        """Merge `entries` (the spec entries of `class_type`, in order) over its base entry."""
+        current = self.target.get(class_type, _MISSING)
+        if current is not self._installed.get(class_type, _MISSING):
+            self._base[class_type] = current
+        base = self._base.get(class_type, _MISSING)
+
+        if not entries:
+            self._base.pop(class_type, None)
+            self._installed.pop(class_type, None)
+            if base is _MISSING:
+                self.target.pop(class_type, None)
+            else:
+                self.target[class_type] = base
+            return
+
+        merged = dict(base) if base is not _MISSING else {}
+        for entry in entries:
+            merged.update(entry)
+        self.target[class_type] = self._installed[class_type] = merged
+
+
+class SpecRegistry:
+    """
+    Keeps the compiled spec files of a folder layered over the capture/sampler dicts.
+    Files that changed, appeared or disappeared are recompiled on the next check.
+    """
+
+    def __init__(self, spec_dir, capture_dict, sampler_dict):
+        self.spec_dir = spec_dir
+        self.capture_layer = SpecLayer(capture_dict)
+        self.sampler_layer = SpecLayer(sampler_dict)
+        self._files = {}  # path -> (mtime, compiled captures, compiled samplers)
+        self.version = 0  # Bumped whenever the registries change
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _scan(self):
+        try:
+            names = os.listdir(self.spec_dir)
+        except OSError:
+            return {}
+        mtimes = {}
+        for name in names:
+            if name.endswith(SPEC_EXTENSIONS):
+                path = os.path.join(self.spec_dir, name)
+                try:
+                    mtimes[path] = os.path.getmtime(path)
+                except OSError:
+                    continue
+        return mtimes
+
+    def _apply(self, capture_keys, sampler_keys):
+        """Rebuild the registry entries of the given class_types from every loaded spec file."""
+        files = [self._files[path] for path in sorted(self._files)]
+        for key in capture_keys:
+            self.capture_layer.apply(key, [captures[key] for _, captures, _ in files if key in captures])
+        for key in sampler_keys:
+            self.sampler_layer.apply(key, [samplers[key] for _, _, samplers in files if key in samplers])
+
+    def reload(self):
+        """Recompile changed spec files. Returns True if the registries changed."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            mtimes = self._scan()
+            capture_keys, sampler_keys = set(), set()
+            changed = False
+
+            for path in list(self._files):
+                if mtimes.get(path) != self._files[path][0]:
+                    _, captures, samplers = self._files.pop(path)
+                    capture_keys.update(captures)
+                    sampler_keys.update(samplers)
+                    changed = True
+
+            for path, mtime in sorted(mtimes.items()):
+                if path in self._files:
+                    continue
+                try:
+                    captures, samplers = load_spec_file(path)
+                except Exception as e:
+                    print_warning(f"Failed to load capture spec {path}: {e}")
+                    self._files[path] = (mtime, {}, {})
+                    continue
+                self._files[path] = (mtime, captures, samplers)
+                capture_keys.update(captures)
+                sampler_keys.update(samplers)
+                changed = True
+
+            if changed:
+                self._apply(capture_keys, sampler_keys)
+                self.version += 1
+            return changed
+
+    def reapply(self, class_types):
+        """
+        Merge the spec fields back over the entries of `class_types` after something else
+        (a lazily loaded ext module) replaced them; the replaced entries become the new base.
+        """
+        with self._lock:
+            files = list(self._files.values())
+            self._apply(
+                {key for key in class_types if any(key in captures for _, captures, _ in files)},
+                {key for key in class_types if any(key in samplers for _, _, samplers in files)},
+            )
+
+    def reload_if_changed(self):
+        if time.monotonic() - self._last_check < RELOAD_INTERVAL:
+            return False
+        return self.reload()
@@ -3,12 +3,32 @@ from collections import deque
 from .samplers import SAMPLERS
 
 
+_node_id_cache = {}  # field_name -> (prompt, registry version, node ids), for the most recent prompt
+
+
 def is_positive_prompt(node_id, obj, prompt, extra_data, outputs, input_data_all):
-    return node_id in _get_node_id_list(prompt, "positive")
+    return node_id in get_prompt_node_ids(prompt, "positive")
 
 
 def is_negative_prompt(node_id, obj, prompt, extra_data, outputs, input_data_all):
-    return node_id in _get_node_id_list(prompt, "negative")
+    return node_id in get_prompt_node_ids(prompt, "negative")
+
+
+def get_prompt_node_ids(prompt, field_name):
+    """
+    Text encode node ids feeding the `field_name` input of the samplers, computed once per
+    prompt and registry version (loaded ext samplers or reloaded specs change the result).
+    """
+    # Imported here: the package imports this module while it initializes
+    from . import registry_version
+
+    version = registry_version()
+    cached = _node_id_cache.get(field_name)
+    if cached is not None and cached[0] is prompt and cached[1] == version:
+        return cached[2]
+    node_ids = frozenset(_get_node_id_list(prompt, field_name))
+    _node_id_cache[field_name] = (prompt, version, node_ids)
+    return node_ids
 
 
 def _get_node_id_list(prompt, field_name):
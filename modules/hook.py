@@ -1,4 +1,5 @@
 from .nodes.node import SaveImageWithMetaData
+from .plan import precompute_plans
 
 current_prompt = {}
 current_extra_data = {}
@@ -15,6 +16,15 @@ def pre_execute(self, prompt, prompt_id, extra_data, execute_outputs):
     current_extra_data = extra_data
     prompt_executer = self
 
+    # Trace trees, sampler and candidate nodes only depend on the graph,
+    # so they are worked out while the prompt executes
+    save_node_ids = [
+        node_id
+        for node_id, node in prompt.items()
+        if node.get("class_type") == SaveImageWithMetaData.__name__
+    ]
+    precompute_plans(prompt, save_node_ids)
+
 
 def pre_get_input_data(inputs, class_def, unique_id, *args):
     global current_save_image_node_id
@@ -1,13 +1,11 @@
 import json
 import os
 import re
+from concurrent.futures import wait
 from datetime import datetime
-from pathlib import Path
 
-import numpy as np
 import piexif
 import piexif.helper
-from PIL import Image
 from PIL.PngImagePlugin import PngInfo
 from enum import Enum
 
@@ -15,8 +13,18 @@ import folder_paths
 
 from .. import hook
 from ..capture import Capture
+from ..plan import get_plan
 from ..trace import Trace
+from ..utils.atomic import get_durability
+from ..utils.catalog import get_catalog
+from ..utils.encode_policy import get_policy
+from ..utils.encoder import get_encoder
+from ..utils.filenames import get_save_image_path
+from ..utils.image import FrameBatch
 from ..utils.log import print_warning
+from ..utils.manifest import build_record, get_manifest
+from ..utils.storage import get_sink, to_key
+from ..utils.write_queue import WRITE_QUEUE
 
 
 class OutputFormat(str, Enum):
@@ -43,12 +51,39 @@ class MetadataScope(str, Enum):
     NONE = "none"
 
 
+class BatchPngInfo:
+    """
+    PNG text chunks of a batch. The chunks shared by every image are serialized once;
+    each image gets a fresh PngInfo with its own "parameters" chunk in front of them.
+    """
+
+    def __init__(self, total_images):
+        self.total_images = total_images
+        self.parameters = None  # parameters text without the batch fields
+        self.shared_chunks = ()
+
+    def image_parameters(self, batch_number):
+        if self.parameters is None or self.total_images <= 1:
+            return self.parameters
+        # The batch fields are the last entries of the parameters line
+        return f"{self.parameters}, Batch index: {batch_number}, Batch size: {self.total_images}"
+
+    def for_image(self, batch_number):
+        metadata = PngInfo()
+        parameters = self.image_parameters(batch_number)
+        if parameters is not None:
+            metadata.add_text("parameters", parameters)
+        metadata.chunks.extend(self.shared_chunks)
+        return metadata
+
+
 # refer. https://github.com/comfyanonymous/ComfyUI/blob/38b7ac6e269e6ecc5bdd6fefdfb2fb1185b09c9d/nodes.py#L1411
 class SaveImageWithMetaData:
     OUTPUT_FORMATS = [e for e in OutputFormat]
     QUALITY_OPTIONS = [e for e in QualityOption]
     METADATA_OPTIONS = [e for e in MetadataScope]
     NEEDS_METADATA_KEYS = {"seed", "width", "height", "pprompt", "nprompt", "model"}
+    COMPRESS_THRESHOLD = 1024  # Smaller chunks gain little from compression
 
     def __init__(self):
         self.output_dir = folder_paths.get_output_directory()
@@ -101,6 +136,21 @@ class SaveImageWithMetaData:
                     "default": True,
                     "tooltip": "Select inputs from closest nodes first if true."
                 }),
+                "compress_workflow": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Store large prompt and workflow chunks of PNG files compressed (zTXt/iTXt)."
+                            "\nThe A1111-style parameters chunk is always left uncompressed."
+                }),
+                "async_save": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Write the images in the background and continue with the next prompt right away."
+                            "\n\nNote: previews may show up before their files are written."
+                }),
+                "write_manifest": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Append a JSON record per saved image (path, size, seed, model, LoRAs, hashes and prompts)"
+                            " to manifest.jsonl in the output directory."
+                }),
             },
             "hidden": {
                 "prompt": "PROMPT",
@@ -130,16 +180,6 @@ class SaveImageWithMetaData:
             QualityOption.LOW: 30
         }.get(quality, 100)
 
-    def find_next_available_filename(self, folder: str, name: str, ext: str):
-        """
-        Finds the next available filename by checking existing files in the directory.
-        """
-        existing = {f.stem for f in Path(folder).glob(f"{name}_*.{ext}")}
-        i = 1
-        while f"{name}_{i:05d}" in existing:
-            i += 1
-        return i
-
     @classmethod
     def parse_filename_placeholders(cls, filename: str) -> list[str]:
         """Extracts placeholder segments like %seed%, %pprompt:32%, etc."""
@@ -155,11 +195,11 @@ class SaveImageWithMetaData:
     def save_images(self, images, filename_prefix="ComfyUI", subdirectory_name="", prompt=None,
                     extra_pnginfo=None, extra_metadata=None, output_format="png",
                     quality="max", metadata_scope="full",
-                    include_batch_num=True, prefer_nearest=True, pnginfo_dict=None):
+                    include_batch_num=True, prefer_nearest=True, compress_workflow=False, async_save=False,
+                    write_manifest=False, pnginfo_dict=None):
 
         extra_metadata = extra_metadata or {}
         base_format, save_workflow_json = self.parse_output_format(output_format)
-        pnginfo = PngInfo()
 
         # Parse filename
         filename_prefix = filename_prefix.strip()
@@ -173,7 +213,7 @@ class SaveImageWithMetaData:
 
 
         image_shape = images[0].shape
-        full_output_folder, filename, counter, subfolder, filename_prefix = folder_paths.get_save_image_path(
+        full_output_folder, filename, subfolder, filename_prefix = get_save_image_path(
             filename_prefix, self.output_dir, image_shape[1], image_shape[0]
         )
 
@@ -184,104 +224,183 @@ class SaveImageWithMetaData:
             full_output_folder = os.path.join(self.output_dir, subdirectory_name)
             filename = filename_prefix
 
-        os.makedirs(full_output_folder, exist_ok=True)
+        # Files are stored by the sink under keys relative to the output directory
+        sink = get_sink(self.output_dir)
+        folder_key = to_key(os.path.relpath(full_output_folder, self.output_dir))
 
         results = list()
         images_length = len(images)
         last_image_filename = None
 
-        # Process each image
-        for batch_number, image in enumerate(images):
-            i = 255. * image.cpu().numpy()
-            img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
-
-            # Prepare metadata
-            metadata = self.prepare_pnginfo(pnginfo, pnginfo_dict, batch_number, images_length, prompt, extra_pnginfo, metadata_scope)
-            for key, value in extra_metadata.items():
-                metadata.add_text(key, value)
+        # Convert the whole batch to 8-bit frames at once, into buffers the encoder can share with its workers
+        encoder = get_encoder()
+        frames = FrameBatch(images, encoder.pool)
+        quality_value = self.get_quality_value(quality)
+        policy = get_policy(encoder.workers)
+        jobs = []
+
+        # EXIF for jpg/webp formats is the same for the whole batch; the encoder embeds it while writing
+        exif_bytes = None
+        if base_format in ["jpg", "webp"]:
+            exif_bytes = piexif.dump({
+                "Exif": {
+                    piexif.ExifIFD.UserComment: piexif.helper.UserComment.dump(Capture.gen_parameters_str(pnginfo_dict), encoding="unicode")
+                }
+            })
+
+        # Prepare metadata
+        batch_pnginfo = None
+        if base_format == "png":
+            batch_pnginfo = self.prepare_pnginfo(
+                pnginfo_dict, images_length, prompt, extra_pnginfo, metadata_scope, extra_metadata, compress_workflow
+            )
 
-            # Handle filename collision and batch number inclusion
-            file = f"{filename}_{batch_number:05d}.{base_format}" if include_batch_num else f"{filename}.{base_format}"
-            path = os.path.join(full_output_folder, file)
-
-            # Check for filename collision (using next available name)
-            if os.path.exists(path):
-                count = self.find_next_available_filename(full_output_folder, filename, base_format)
-                file = f"{filename}_{count:05d}.{base_format}"
-                path = os.path.join(full_output_folder, file)
+        # Process each image
+        for batch_number in range(images_length):
+            # Handle filename collision and batch number inclusion: the sink claims the name right away,
+            # so images still waiting to be encoded can't collide with later ones
+            preferred = f"{filename}_{batch_number:05d}.{base_format}" if include_batch_num else f"{filename}.{base_format}"
+            file = sink.allocate(folder_key, filename, base_format, preferred)
 
             last_image_filename = file
-            quality_value = self.get_quality_value(quality)
 
             # Save image based on format
             if base_format == "webp":
-                img.save(path, "WEBP", lossless=(quality_value == 100), quality=quality_value)
+                image_format, save_kwargs = "WEBP", {"lossless": (quality_value == 100), "quality": quality_value}
             elif base_format == "png":
-                img.save(path, pnginfo=metadata, compress_level=self.compress_level)
+                # Every image gets its own chunks; only its batch fields are rendered here
+                metadata = batch_pnginfo.for_image(batch_number) if batch_pnginfo else None
+                image_format, save_kwargs = "PNG", {"pnginfo": metadata, "compress_level": self.compress_level}
             else:
-                img.save(path, optimize=True, quality=quality_value)
-
-            # Insert EXIF for jpg/webp formats
-            if base_format in ["jpg", "webp"]:
-                exif_bytes = piexif.dump({
-                    "Exif": {
-                        piexif.ExifIFD.UserComment: piexif.helper.UserComment.dump(Capture.gen_parameters_str(pnginfo_dict), encoding="unicode")
-                    }
-                })
-                piexif.insert(exif_bytes, path)
+                image_format, save_kwargs = "JPEG", {"optimize": True, "quality": quality_value}
+            save_kwargs.update(policy.effort(image_format))
 
+            jobs.append((batch_number, to_key(folder_key, file), image_format, save_kwargs, exif_bytes))
             results.append({"filename": file, "subfolder": full_output_folder, "type": self.type})
 
         # Save workflow metadata for the batch
+        batch_json_file = None
         if save_workflow_json and images_length > 0 and last_image_filename:
             json_filename = last_image_filename.replace(base_format, "json")
-            batch_json_file = os.path.join(full_output_folder, json_filename)
+            batch_json_file = to_key(folder_key, json_filename)
+        workflow = extra_pnginfo["workflow"] if batch_json_file else None
 
-            with open(batch_json_file, "w", encoding="utf-8") as f:
-                json.dump(extra_pnginfo["workflow"], f)
+        # Saved images are recorded in the manifest and the catalog from one record of the batch
+        manifest = get_manifest(self.output_dir) if write_manifest else None
+        catalog = get_catalog()
+        record = build_record(pnginfo_dict) if manifest or catalog else None
+
+        def write_batch():
+            self.write_batch(encoder, sink, frames, jobs, batch_json_file, workflow, record, manifest, catalog)
+
+        if async_save:
+            WRITE_QUEUE.put(write_batch, f"{len(jobs)} image(s) to {full_output_folder}")
+        else:
+            write_batch()
 
         return {"ui": {"images": results}}
 
-    def prepare_pnginfo(self, metadata, pnginfo_dict, batch_number, total_images, prompt, extra_pnginfo, metadata_scope):
+    @staticmethod
+    def write_batch(encoder, sink, frames, jobs, batch_json_file=None, workflow=None, record=None, manifest=None, catalog=None):
         """
-        Return final PNG metadata with batch information, parameters, and optional prompt details.
+        Encode the frames of a batch in parallel and write them and the workflow JSON to `sink`.
+        Every write is waited for, so one failure doesn't strand the others: the files that
+        were written are completed (together, with "batch" durability) and the images added to
+        `manifest` and `catalog`, the names of the failed ones are released, then the first
+        error is raised.
         """
+        policy = get_policy(encoder.workers)
+        durability = get_durability()
+        futures = []
+        errors = []
+        try:
+            for job in jobs:
+                futures.append(encoder.submit(sink, frames, *job, durability))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            wait(futures)
+            frames.release()
+
+        written = []
+        saved = []
+        for index, (batch_number, key, image_format, save_kwargs, _) in enumerate(jobs):
+            if index >= len(futures):
+                sink.discard(key)  # Never submitted
+                continue
+            try:
+                key, encode_ms, size = futures[index].result()
+            except Exception as e:
+                errors.append(e)
+                sink.discard(key)
+                continue
+            written.append(key)
+            saved.append((key, size, image_format, batch_number))
+            policy.record(image_format, save_kwargs, key, encode_ms, size, WRITE_QUEUE.backlog())
+
+        if batch_json_file:
+            try:
+                sink.write(batch_json_file, json.dumps(workflow).encode("utf-8"), "application/json", durability=durability)
+                written.append(batch_json_file)
+            except Exception as e:
+                errors.append(e)
+
+        if durability == "batch" and written:
+            sink.finish_batch(written)
+        if manifest is not None:
+            for key, size, image_format, batch_number in saved:
+                manifest.append(key, size, image_format, record, batch_index=batch_number)
+        if catalog is not None and saved:
+            catalog.add_batch([(key, size, image_format) for key, size, image_format, _ in saved], record)
+        if errors:
+            raise errors[0]
+
+    def prepare_pnginfo(self, pnginfo_dict, total_images, prompt, extra_pnginfo, metadata_scope, extra_metadata=None,
+                        compress_workflow=False):
+        """
+        Return the PNG metadata of a batch: parameters, optional prompt details and extra metadata.
+        The chunks shared by every image are serialized here once. With `compress_workflow`, prompt
+        and extra_pnginfo chunks of at least COMPRESS_THRESHOLD characters are stored compressed.
+        """
+        def add_json(key, value):
+            text = json.dumps(value)
+            shared.add_text(key, text, zip=compress_workflow and len(text) >= self.COMPRESS_THRESHOLD)
+
         if metadata_scope == MetadataScope.NONE:
             return None
 
-        if pnginfo_dict:
-            pnginfo_copy = pnginfo_dict.copy()
+        batch_info = BatchPngInfo(total_images)
+        shared = PngInfo()
+        parameters_only = False
 
-            if total_images > 1:
-                pnginfo_copy["Batch index"] = batch_number
-                pnginfo_copy["Batch size"] = total_images
+        if pnginfo_dict and metadata_scope in [MetadataScope.FULL, MetadataScope.PARAMETERS_ONLY]:
+            parameters = Capture.gen_parameters_str(pnginfo_dict)
+            if parameters and "Steps" in parameters:
+                batch_info.parameters = parameters
+                parameters_only = metadata_scope == MetadataScope.PARAMETERS_ONLY
 
-            if metadata_scope in [MetadataScope.FULL, MetadataScope.PARAMETERS_ONLY]:
-                parameters = Capture.gen_parameters_str(pnginfo_copy)
-                if parameters and "Steps" in parameters:
-                    metadata.add_text("parameters", parameters)
-                    if metadata_scope == MetadataScope.PARAMETERS_ONLY:
-                        return metadata
+        if not parameters_only:
+            if prompt is not None and metadata_scope != MetadataScope.WORKFLOW_ONLY:
+                add_json("prompt", prompt)
 
-        if prompt is not None and metadata_scope != MetadataScope.WORKFLOW_ONLY:
-            metadata.add_text("prompt", json.dumps(prompt))
+            if extra_pnginfo is not None:
+                for x in extra_pnginfo:
+                    add_json(x, extra_pnginfo[x])
 
-        if extra_pnginfo is not None:
-            for x in extra_pnginfo:
-                metadata.add_text(x, json.dumps(extra_pnginfo[x]))
+        for key, value in (extra_metadata or {}).items():
+            shared.add_text(key, value)
 
-        return metadata
+        batch_info.shared_chunks = tuple(shared.chunks)
+        return batch_info
 
     @classmethod
     def gen_pnginfo(s, prompt, prefer_nearest):
-        inputs = Capture.get_inputs()
-        trace_tree_from_this_node = Trace.trace(hook.current_save_image_node_id, prompt)
-        inputs_before_this_node = Trace.filter_inputs_by_trace_tree(inputs, trace_tree_from_this_node, prefer_nearest)
-
-        sampler_node_id = Trace.find_sampler_node_id(trace_tree_from_this_node)
-        if sampler_node_id:
-            trace_tree_from_sampler_node = Trace.trace(sampler_node_id, prompt)
-            inputs_before_sampler_node = Trace.filter_inputs_by_trace_tree(inputs, trace_tree_from_sampler_node, prefer_nearest)
+        plan = get_plan(prompt, hook.current_save_image_node_id)
+        inputs = Capture.get_inputs(plan.candidates)
+        inputs_before_this_node = Trace.filter_inputs_by_trace_tree(inputs, plan.trace_tree, prefer_nearest)
+
+        if plan.sampler_node_id:
+            inputs_before_sampler_node = Trace.filter_inputs_by_trace_tree(inputs, plan.sampler_trace_tree, prefer_nearest)
         else:
             inputs_before_sampler_node = {}
 
@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .defs import ensure_extensions, registry_version
+from .defs.captures import CAPTURE_FIELD_LIST, NODE_EXTRACTORS
+from .defs.validators import get_prompt_node_ids
+from .trace import Trace
+from .utils.log import print_warning
+
+PLAN_CACHE_SIZE = 64
+
+
+def _structure_signature(prompt):
+    """
+    Hashable description of the graph shape: every node's class_type and the edges the trace
+    follows from it. Those are the node ids Trace.input_targets finds in the inputs, which
+    include widget values that happen to name a node (steps=20 reaches node "20"), so the
+    signature only matches when a fresh trace would give the same tree. Other widget values
+    are left out, so runs that only change seeds, prompts, etc. share a signature.
+    """
+    structure = []
+    for node_id, node in prompt.items():
+        edges = tuple(
+            (name, target)
+            for name, value in node.get("inputs", {}).items()
+            for target in Trace.input_targets(value)
+            if isinstance(target, str) and target in prompt
+        )
+        structure.append((node_id, node.get("class_type", ""), edges))
+    return tuple(structure)
+
+
+class CapturePlan:
+    """
+    Everything about a capture that only depends on the workflow structure:
+    the trace tree of the save node, the selected sampler and its trace tree, and
+    the upstream nodes that have capture rules. Plans are cached by structural
+    signature, so repeated runs of the same workflow skip graph analysis.
+    """
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, prompt, save_node_id, version=None):
+        self.save_node_id = save_node_id
+        self.version = version
+        self.trace_tree = Trace.trace(save_node_id, prompt)
+        self.sampler_node_id = Trace.find_sampler_node_id(self.trace_tree)
+        self.sampler_trace_tree = Trace.trace(self.sampler_node_id, prompt) if self.sampler_node_id else {}
+        # Nodes outside the save node's trace tree are filtered out later anyway
+        self.candidates = [
+            node_id
+            for node_id, node in prompt.items()
+            if node_id in self.trace_tree
+            and (node["class_type"] in CAPTURE_FIELD_LIST or node["class_type"] in NODE_EXTRACTORS)
+        ]
+
+    @classmethod
+    def get(cls, prompt, save_node_id):
+        """
+        Return the cached plan for this prompt's structure, compiling it on a miss.
+        The definitions the prompt needs must already be loaded (see ensure_extensions).
+        """
+        version = registry_version()
+        key = (save_node_id, version, _structure_signature(prompt))
+
+        with cls._lock:
+            plan = cls._cache.get(key)
+            if plan is not None:
+                cls._cache.move_to_end(key)
+                return plan
+
+        plan = cls(prompt, save_node_id, version)
+        with cls._lock:
+            cls._cache[key] = plan
+            while len(cls._cache) > PLAN_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        return plan
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._lock:
+            cls._cache.clear()
+
+
+# Plans for the running prompt are compiled on this thread while the sampler works.
+# It only reads the definition registries; they are loaded and reloaded on the execution thread.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture_plan")
+_pending = {}  # save node id -> (prompt, future)
+_pending_lock = threading.Lock()
+
+
+def _analyze(prompt, save_node_id):
+    plan = CapturePlan.get(prompt, save_node_id)
+    # Warm the prompt validators while ext samplers are known
+    get_prompt_node_ids(prompt, "positive")
+    get_prompt_node_ids(prompt, "negative")
+    return plan
+
+
+def precompute_plans(prompt, save_node_ids):
+    """Start compiling the plans of `save_node_ids` in the background, replacing those of the previous prompt."""
+    ensure_extensions(prompt)
+    with _pending_lock:
+        for _, future in _pending.values():
+            future.cancel()
+        _pending.clear()
+        for save_node_id in save_node_ids:
+            _pending[save_node_id] = (prompt, _executor.submit(_analyze, prompt, save_node_id))
+
+
+def get_plan(prompt, save_node_id):
+    """Return the plan precomputed for this prompt if there is one, otherwise compile (or look up) it now."""
+    ensure_extensions(prompt)
+    with _pending_lock:
+        pending = _pending.get(save_node_id)
+
+    if pending is not None and pending[0] is prompt:
+        try:
+            plan = pending[1].result()
+            # Definitions loaded since the plan was compiled may add candidates
+            if plan.version == registry_version():
+                return plan
+        except Exception as e:
+            print_warning(f"Failed to precompute the capture plan of node {save_node_id}: {e}")
+
+    return CapturePlan.get(prompt, save_node_id)
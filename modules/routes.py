@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from .defs import EXTENSIONS
+from .utils.catalog import PAGE_SIZE, get_catalog
+from .utils.guard import EXTRACTOR_GUARD
+from .utils.write_queue import WRITE_QUEUE
+
+try:
+    from aiohttp import web
+    from server import PromptServer
+except ImportError:
+    PromptServer = None
+
+CATALOG_ROUTE = "/image_metadata/catalog"
+EXTENSIONS_ROUTE = "/image_metadata/extensions"
+EXTRACTORS_ROUTE = "/image_metadata/extractors"
+WRITE_QUEUE_ROUTE = "/image_metadata/write_queue"
+
+
+def _date(value, end=False):
+    """Timestamp of the start of a YYYY-MM-DD day (local time), or of the day after with `end`."""
+    day = datetime.strptime(value, "%Y-%m-%d")
+    return (day + timedelta(days=1) if end else day).timestamp()
+
+
+def _number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def parse_query(query):
+    """Catalog.query arguments from the query string. Raises ValueError for malformed values."""
+    return {
+        "seed": _number(query["seed"]) if "seed" in query else None,
+        "model_hash": query.get("model_hash"),
+        "lora_hash": query.get("lora_hash"),
+        "lora": query.get("lora"),
+        "sampler": query.get("sampler"),
+        "subfolder": query.get("subfolder"),
+        "created_after": _date(query["from"]) if "from" in query else None,
+        "created_before": _date(query["to"], end=True) if "to" in query else None,
+        "limit": int(query.get("limit", PAGE_SIZE)),
+        "cursor": int(query["cursor"]) if "cursor" in query else None,
+    }
+
+
+def register_routes(server):
+    @server.routes.get(CATALOG_ROUTE)
+    async def query_catalog(request):
+        """
+        Paginated search of saved images, newest first, e.g.
+        /image_metadata/catalog?lora_hash=85675ec8aa&seed=42&limit=50
+        Filters: seed, model_hash, lora_hash, lora, sampler, subfolder, from, to (YYYY-MM-DD).
+        Returns {"images": [...], "next_cursor": ...}; pass next_cursor as `cursor` for the next page.
+        """
+        catalog = get_catalog()
+        if catalog is None:
+            return web.json_response({"error": "The catalog is disabled"}, status=404)
+        try:
+            args = parse_query(request.query)
+        except ValueError as e:
+            return web.json_response({"error": f"Invalid query: {e}"}, status=400)
+        result = await asyncio.get_running_loop().run_in_executor(None, lambda: catalog.query(**args))
+        return web.json_response(result)
+
+    @server.routes.get(EXTENSIONS_ROUTE)
+    async def extension_report(request):
+        """Import time in ms of every loaded ext module, slowest first."""
+        return web.json_response({"load_ms": EXTENSIONS.get_load_report()})
+
+    @server.routes.get(EXTRACTORS_ROUTE)
+    async def extractor_report(request):
+        """Cost of every capture extractor, most expensive first, and whether it was disabled."""
+        return web.json_response({"extractors": EXTRACTOR_GUARD.get_report()})
+
+    @server.routes.post(EXTRACTORS_ROUTE + "/reset")
+    async def reset_extractors(request):
+        """Re-enable disabled extractors: those of ?class_type=..., or all of them."""
+        EXTRACTOR_GUARD.reset(request.query.get("class_type"))
+        return web.json_response({"extractors": EXTRACTOR_GUARD.get_report()})
+
+    @server.routes.get(WRITE_QUEUE_ROUTE)
+    async def write_queue_stats(request):
+        """Depth, throughput and failures of the async write queue ("failed" counts batches that were lost)."""
+        return web.json_response(WRITE_QUEUE.get_stats())
+
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    register_routes(PromptServer.instance)
@@ -2,9 +2,48 @@ from collections import deque, defaultdict
 from .defs.samplers import SAMPLERS
 from .utils.log import print_warning
 
+
+class FieldIndex:
+    """Inverted index of input field name -> node ids, built in a single pass over a prompt."""
+
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self._order = {}
+        self._fields = defaultdict(list)
+        for position, (node_id, node) in enumerate(prompt.items()):
+            self._order[node_id] = position
+            for field in node.get("inputs", {}):
+                self._fields[field].append(node_id)
+
+    def node_ids_with_any(self, fields):
+        """Node ids having at least one of `fields`, in prompt order."""
+        node_ids = set()
+        for field in fields:
+            node_ids.update(self._fields.get(field, ()))
+        return sorted(node_ids, key=self._order.__getitem__)
+
+
 class Trace:
     _trace_cache = {}
 
+    @staticmethod
+    def input_targets(value):
+        """The node ids an input value points to, as followed by the traversal (before checking they exist)."""
+        values = value if isinstance(value, list) else [value]
+        for next_id in values:
+            if next_id is None:
+                continue
+
+            # Handle dict-based links (ComfyUI internal link structures)
+            if isinstance(next_id, dict):
+                next_id = next_id.get("link") or next_id.get("id") or next_id.get("node_id")
+
+            # Skip if still invalid
+            if next_id is None or isinstance(next_id, dict):
+                continue
+
+            yield str(next_id) if isinstance(next_id, int) else next_id
+
     @staticmethod
     def _bfs_traverse(start_node_id, prompt, visit_node, edge_condition=None):
         Q = deque([(start_node_id, 0)])
@@ -21,25 +60,7 @@ class Trace:
             visit_node(current_node_id, node, distance)
 
             for value in node.get("inputs", {}).values():
-                if isinstance(value, list):
-                    values = value
-                else:
-                    values = [value]
-
-                for next_id in values:
-                    if next_id is None:
-                        continue
-
-                    # Handle dict-based links (ComfyUI internal link structures)
-                    if isinstance(next_id, dict):
-                        next_id = next_id.get("link") or next_id.get("id") or next_id.get("node_id")
-
-                    # Skip if still invalid
-                    if next_id is None or isinstance(next_id, dict):
-                        continue
-
-                    next_id = str(next_id) if isinstance(next_id, int) else next_id
-
+                for next_id in Trace.input_targets(value):
                     edge = (current_node_id, next_id)
                     if edge in visited_edges or (edge_condition and not edge_condition(current_node_id, next_id)):
                         continue
@@ -82,19 +103,14 @@ class Trace:
         return None
 
     @classmethod
-    def find_node_with_fields(cls, prompt, required_fields):
-        for node_id, node in prompt.items():
-            if required_fields & set(node.get("inputs", {}).keys()):
-                return node_id, node
-        return None, None
-    
+    def find_node_with_fields(cls, prompt, required_fields, field_index=None):
+        results = cls.find_all_nodes_with_fields(prompt, required_fields, field_index)
+        return results[0] if results else (None, None)
+
     @classmethod
-    def find_all_nodes_with_fields(cls, prompt, required_fields):
-        results = []
-        for node_id, node in prompt.items():
-            if required_fields & set(node.get("inputs", {}).keys()):
-                results.append((node_id, node))
-        return results
+    def find_all_nodes_with_fields(cls, prompt, required_fields, field_index=None):
+        field_index = field_index or FieldIndex(prompt)
+        return [(node_id, prompt[node_id]) for node_id in field_index.node_ids_with_any(required_fields)]
 
     @classmethod
     def find_sampler_node_id(cls, trace_tree):
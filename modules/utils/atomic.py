@@ -0,0 +1,78 @@
+"""
+Crash-safe writes: files are written under a hidden partial name next to their final path
+and renamed into place once complete, so a crash never leaves a truncated file behind a
+real name.
+
+DURABILITY decides what is flushed to disk before a file counts as saved:
+  - "none": nothing; the rename alone keeps partial files out of sight.
+  - "file": every file is fsynced before its rename, and the folder after it.
+  - "batch": files of a batch are renamed together by finish_batch(), after one fsync
+    pass over them, followed by one fsync of each folder.
+"""
+import os
+
+from .log import print_warning
+
+DURABILITY = "none"  # "none", "file" or "batch"
+DURABILITY_MODES = ("none", "file", "batch")
+PARTIAL_SUFFIX = ".part"
+
+
+def get_durability():
+    if DURABILITY not in DURABILITY_MODES:
+        print_warning(f"Unknown durability '{DURABILITY}', using 'none'")
+        return "none"
+    return DURABILITY
+
+
+def partial_path(path):
+    """The hidden name `path` is written under until it is complete."""
+    folder, file = os.path.split(path)
+    return os.path.join(folder, f".{file}{PARTIAL_SUFFIX}")
+
+
+def fsync_file(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_dir(folder):
+    """Persist renames in `folder`. Directories can't be opened for fsync on Windows."""
+    if os.name == "nt":
+        return
+    fsync_file(folder or ".")
+
+
+def finish(path, durability=None):
+    """Move the completed partial file of `path` into place. Batch durability leaves it for finish_batch()."""
+    durability = durability or get_durability()
+    if durability == "batch":
+        return
+    partial = partial_path(path)
+    if durability == "file":
+        fsync_file(partial)
+    os.replace(partial, path)
+    if durability == "file":
+        fsync_dir(os.path.dirname(path))
+
+
+def finish_batch(paths):
+    """Flush the partial files of `paths`, move them all into place, then flush their folders once."""
+    for path in paths:
+        fsync_file(partial_path(path))
+    for path in paths:
+        os.replace(partial_path(path), path)
+    for folder in {os.path.dirname(path) for path in paths}:
+        fsync_dir(folder)
+
+
+def discard(path):
+    """Remove the partial file of `path`, if any."""
+    try:
+        os.remove(partial_path(path))
+    except FileNotFoundError:
+        pass
+
@@ -0,0 +1,250 @@
+"""
+SQLite catalog of saved images and their generation parameters.
+
+Every saved image gets a row keyed by its path relative to the output directory, with
+indexes on seed, model hash, sampler, creation time and subfolder; its LoRAs go to a
+separate table indexed by hash and name. The database runs in WAL mode, so the
+gallery route can read while batches are being added.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from .log import print_error
+from .manifest import build_record
+from .parameters import parse_parameters
+from .reader import IMAGE_EXTENSIONS, read_parameters
+
+CATALOG_ENABLED = False  # Opt-in: every save writes to the database once enabled
+CATALOG_NAME = "catalog.sqlite"  # In the node's .cache folder
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+BACKFILL_COMMIT_EVERY = 500  # Images added per transaction while backfilling
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    subfolder TEXT NOT NULL,
+    format TEXT,
+    size INTEGER,
+    created REAL NOT NULL,
+    seed INTEGER,
+    steps INTEGER,
+    cfg REAL,
+    sampler TEXT,
+    model TEXT,
+    model_hash TEXT,
+    positive TEXT,
+    negative TEXT
+);
+CREATE TABLE IF NOT EXISTS image_loras (
+    image_id INTEGER NOT NULL,
+    name TEXT,
+    hash TEXT,
+    weight REAL
+);
+CREATE INDEX IF NOT EXISTS images_seed ON images (seed);
+CREATE INDEX IF NOT EXISTS images_model_hash ON images (model_hash);
+CREATE INDEX IF NOT EXISTS images_sampler ON images (sampler);
+CREATE INDEX IF NOT EXISTS images_created ON images (created);
+CREATE INDEX IF NOT EXISTS images_subfolder ON images (subfolder);
+CREATE INDEX IF NOT EXISTS image_loras_hash ON image_loras (hash, image_id);
+CREATE INDEX IF NOT EXISTS image_loras_name ON image_loras (name, image_id);
+CREATE INDEX IF NOT EXISTS image_loras_image ON image_loras (image_id);
+"""
+
+IMAGE_COLUMNS = (
+    "path", "subfolder", "format", "size", "created", "seed", "steps", "cfg",
+    "sampler", "model", "model_hash", "positive", "negative",
+)
+
+
+def _seed(value):
+    # Seeds go up to 2**64 - 1, past what an SQLite integer holds
+    if isinstance(value, int) and not -2**63 <= value < 2**63:
+        return str(value)
+    return value
+
+
+def _hash(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+class Catalog:
+    """One connection per thread on the same database file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _add(self, conn, key, size, image_format, record, created):
+        subfolder = key.rpartition("/")[0]
+        values = (
+            key, subfolder, image_format, size, created, _seed(record.get("seed")), record.get("steps"),
+            record.get("cfg"), record.get("sampler"), record.get("model"), _hash(record.get("model_hash")),
+            record.get("positive"), record.get("negative"),
+        )
+        row = conn.execute("SELECT id FROM images WHERE path = ?", (key,)).fetchone()
+        if row is None:
+            image_id = conn.execute(
+                f"INSERT INTO images ({', '.join(IMAGE_COLUMNS)}) VALUES ({', '.join('?' * len(IMAGE_COLUMNS))})", values
+            ).lastrowid
+        else:
+            image_id = row["id"]
+            conn.execute(f"UPDATE images SET {', '.join(f'{c} = ?' for c in IMAGE_COLUMNS)} WHERE id = ?", (*values, image_id))
+            conn.execute("DELETE FROM image_loras WHERE image_id = ?", (image_id,))
+        conn.executemany(
+            "INSERT INTO image_loras (image_id, name, hash, weight) VALUES (?, ?, ?, ?)",
+            [(image_id, lora.get("name"), _hash(lora.get("hash")), lora.get("weight")) for lora in record.get("loras", [])],
+        )
+
+    def add_batch(self, saved, record, created=None):
+        """
+        Add (key, size, format) entries of images that share `record` (see manifest.build_record),
+        in one transaction. Errors are reported, not raised, so they never fail a save.
+        """
+        created = created or time.time()
+        try:
+            with self._connection() as conn:
+                for key, size, image_format in saved:
+                    self._add(conn, key, size, image_format, record, created)
+        except sqlite3.Error as e:
+            print_error(f"Failed to add {len(saved)} image(s) to the catalog: {e}")
+
+    def query(self, seed=None, model_hash=None, lora_hash=None, lora=None, sampler=None, subfolder=None,
+              created_after=None, created_before=None, limit=PAGE_SIZE, cursor=None):
+        """
+        Newest first. Returns {"images": [...], "next_cursor": id or None}; pass next_cursor
+        back as `cursor` for the following page.
+        """
+        where, args = [], []
+        for column, value in (("seed", _seed(seed)), ("model_hash", _hash(model_hash)), ("sampler", sampler), ("subfolder", subfolder)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if lora_hash is not None:
+            where.append("id IN (SELECT image_id FROM image_loras WHERE hash = ?)")
+            args.append(_hash(lora_hash))
+        if lora is not None:
+            where.append("id IN (SELECT image_id FROM image_loras WHERE name = ?)")
+            args.append(lora)
+        if created_after is not None:
+            where.append("created >= ?")
+            args.append(created_after)
+        if created_before is not None:
+            where.append("created < ?")
+            args.append(created_before)
+        if cursor is not None:
+            where.append("id < ?")
+            args.append(cursor)
+
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        sql = f"SELECT id, {', '.join(IMAGE_COLUMNS)} FROM images"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+
+        conn = self._connection()
+        rows = conn.execute(sql, (*args, limit + 1)).fetchall()
+        more = len(rows) > limit
+        images = [dict(row) for row in rows[:limit]]
+
+        if images:
+            by_id = {image["id"]: image for image in images}
+            for image in images:
+                image["loras"] = []
+            lora_rows = conn.execute(
+                f"SELECT image_id, name, hash, weight FROM image_loras WHERE image_id IN ({', '.join('?' * len(by_id))})",
+                tuple(by_id),
+            )
+            for row in lora_rows:
+                by_id[row["image_id"]]["loras"].append({"name": row["name"], "hash": row["hash"], "weight": row["weight"]})
+
+        return {"images": images, "next_cursor": images[-1]["id"] if more else None}
+
+    def indexed_sizes(self):
+        """path -> size of every image in the catalog."""
+        return {row["path"]: row["size"] for row in self._connection().execute("SELECT path, size FROM images")}
+
+
+def backfill(catalog, output_dir, progress=None):
+    """
+    Add the images under `output_dir` that are missing from the catalog (or changed size),
+    reading their parameters text. Returns the number of images added.
+    """
+    indexed = catalog.indexed_sizes()
+    pending = []
+    added = 0
+
+    def flush():
+        nonlocal added
+        conn = catalog._connection()
+        with conn:
+            for key, size, image_format, record, created in pending:
+                catalog._add(conn, key, size, image_format, record, created)
+        added += len(pending)
+        pending.clear()
+        if progress:
+            progress(added)
+
+    for root, dirs, files in os.walk(output_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for file in sorted(files):
+            if file.startswith(".") or not file.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(root, file)
+            key = os.path.relpath(path, output_dir).replace(os.sep, "/")
+            try:
+                stat = os.stat(path)
+                if indexed.get(key) == stat.st_size:
+                    continue
+                text = read_parameters(path)
+            except Exception as e:
+                print_error(f"Failed to read {path}: {e}")
+                continue
+            image_format = "JPEG" if file.lower().endswith((".jpg", ".jpeg")) else os.path.splitext(file)[1][1:].upper()
+            pending.append((key, stat.st_size, image_format, build_record(parse_parameters(text)), stat.st_mtime))
+            if len(pending) >= BACKFILL_COMMIT_EVERY:
+                flush()
+    if pending:
+        flush()
+    return added
+
+
+_catalog = None
+_catalog_failed = False  # The database couldn't be opened; not retried on every save
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    The shared catalog, or None when CATALOG_ENABLED is off or the database can't be opened.
+    A failed open is reported once and not retried until the next restart.
+    """
+    global _catalog, _catalog_failed
+    if not CATALOG_ENABLED or _catalog_failed:
+        return None
+    with _catalog_lock:
+        if _catalog is None and not _catalog_failed:
+            # Imported here: tools load this module outside the package
+            from ..config import NODE_CACHE_DIR
+            try:
+                _catalog = Catalog(os.path.join(NODE_CACHE_DIR, CATALOG_NAME))
+            except sqlite3.Error as e:
+                _catalog_failed = True
+                print_error(f"Failed to open the catalog, it stays disabled until restart: {e}")
+        return _catalog
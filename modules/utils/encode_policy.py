@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+
+from ..config import NODE_CACHE_DIR
+from .log import print_error
+
+ENCODER_POLICY = "fixed"  # "fixed" keeps the node's settings, "adaptive" tunes compression effort
+TARGET_IMAGES_PER_S = 4.0  # Throughput the adaptive policy tries to keep up
+BYTES_BUDGET = None  # Average file size to stay under (bytes), or None
+BACKLOG_HIGH = 2  # Batches waiting to start (WriteQueue.backlog) at which the adaptive policy backs off
+ADJUST_EVERY = 8  # Encoded files between effort adjustments
+EWMA_ALPHA = 0.3
+
+# format -> (save argument, lowest effort, highest effort, starting effort)
+EFFORT_BOUNDS = {
+    "PNG": ("compress_level", 1, 9, 4),
+    "WEBP": ("method", 0, 6, 4),
+    "JPEG": ("optimize", 0, 1, 1),
+}
+
+AUDIT_FILE = os.path.join(NODE_CACHE_DIR, "encode_audit.jsonl")
+AUDIT_MAX_BYTES = 10 * 1024 * 1024  # Rotated to AUDIT_FILE + ".1" past this size
+
+
+class FixedPolicy:
+    """Leaves the save arguments as the node chose them."""
+
+    name = "fixed"
+
+    def effort(self, image_format):
+        return {}
+
+    def record(self, image_format, save_kwargs, path, encode_ms, size, backlog=0):
+        pass
+
+
+class AdaptivePolicy:
+    """
+    Moves the compression effort of each format between EFFORT_BOUNDS.
+
+    Encode time and file size are tracked as moving averages. Every ADJUST_EVERY files
+    the effort goes down if the estimated throughput is below TARGET_IMAGES_PER_S or the
+    write queue is backing up, and up if files are over BYTES_BUDGET or there is
+    throughput to spare. Every file's effort is appended to AUDIT_FILE.
+    """
+
+    name = "adaptive"
+
+    def __init__(self, workers=1, target_images_per_s=TARGET_IMAGES_PER_S, bytes_budget=BYTES_BUDGET):
+        self.workers = max(1, workers)
+        self.target_images_per_s = target_images_per_s
+        self.bytes_budget = bytes_budget
+        self._levels = {fmt: bounds[3] for fmt, bounds in EFFORT_BOUNDS.items()}
+        self._encode_ms = {}
+        self._size = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def effort(self, image_format):
+        bounds = EFFORT_BOUNDS.get(image_format)
+        if bounds is None:
+            return {}
+        arg, low, high, _ = bounds
+        level = self._levels[image_format]
+        return {arg: bool(level) if arg == "optimize" else level}
+
+    def _ewma(self, averages, image_format, value):
+        previous = averages.get(image_format)
+        averages[image_format] = value if previous is None else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * previous
+        return averages[image_format]
+
+    def record(self, image_format, save_kwargs, path, encode_ms, size, backlog=0):
+        bounds = EFFORT_BOUNDS.get(image_format)
+        if bounds is None:
+            return
+        arg, low, high, _ = bounds
+
+        with self._lock:
+            avg_encode_ms = self._ewma(self._encode_ms, image_format, encode_ms)
+            avg_size = self._ewma(self._size, image_format, size)
+            self._samples[image_format] = self._samples.get(image_format, 0) + 1
+
+            if self._samples[image_format] >= ADJUST_EVERY:
+                self._samples[image_format] = 0
+                images_per_s = self.workers * 1000 / max(avg_encode_ms, 1e-3)
+                too_slow = images_per_s < self.target_images_per_s or backlog >= BACKLOG_HIGH
+                too_big = self.bytes_budget is not None and avg_size > self.bytes_budget
+                level = self._levels[image_format]
+                if too_slow and not too_big:
+                    level -= 1
+                elif too_big or (images_per_s > 1.5 * self.target_images_per_s and not backlog):
+                    level += 1
+                self._levels[image_format] = min(high, max(low, level))
+
+            self._audit({
+                "time": time.time(),
+                "path": path,
+                "format": image_format,
+                arg: save_kwargs.get(arg),
+                "encode_ms": round(encode_ms, 3),
+                "bytes": size,
+            })
+
+    def _audit(self, entry):
+        try:
+            if os.path.exists(AUDIT_FILE) and os.path.getsize(AUDIT_FILE) > AUDIT_MAX_BYTES:
+                os.replace(AUDIT_FILE, AUDIT_FILE + ".1")
+            with open(AUDIT_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print_error(f"Failed to write {AUDIT_FILE}: {e}")
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_policy(workers=1):
+    """The shared policy configured by ENCODER_POLICY."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = AdaptivePolicy(workers) if ENCODER_POLICY == "adaptive" else FixedPolicy()
+        return _policy
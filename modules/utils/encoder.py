@@ -0,0 +1,248 @@
+"""
+Parallel encoding of the frames of a batch.
+
+Encoders take frames from a FrameBatch, encode them in memory and pass the bytes to a
+storage sink (see storage.py). They differ only in
+where the work runs:
+  - "serial": on the calling thread.
+  - "thread": on a thread pool. Pillow releases the GIL while encoding and writing.
+  - "process": on a process pool. Frames are read from a shared memory buffer, so
+    pixels are never copied or pickled. Needs the "fork" start method; a custom node
+    package can't be imported by name in a spawned interpreter.
+Jobs are submitted in batch order and return futures, so callers decide names and order.
+"""
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from .image import BufferPool, FrameBatch, frame_image
+from .log import print_warning
+from .storage import LocalSink
+
+ENCODER_BACKEND = "thread"  # "serial", "thread" or "process"
+ENCODER_WORKERS = min(4, os.cpu_count() or 1)
+MAX_ATTACHED_SEGMENTS = 8  # Shared memory segments a worker process keeps mapped
+
+
+def write_image(sink, img, key, image_format, save_kwargs, exif=None, durability=None):
+    """
+    Encode one frame and write it to `sink` under `key`.
+    EXIF bytes, if any, are embedded by the encoder, so the file is encoded once.
+    Returns (key, encode and write time in ms, file size in bytes).
+    """
+    start = time.perf_counter()
+    if exif:
+        save_kwargs = dict(save_kwargs, exif=exif)
+    buffer = io.BytesIO()
+    img.save(buffer, image_format, **save_kwargs)
+    size = sink.write(key, buffer.getbuffer(), Image.MIME.get(image_format), {"format": image_format}, durability)
+    return key, (time.perf_counter() - start) * 1000, size
+
+
+class SharedBufferPool(BufferPool):
+    """A BufferPool whose buffers live in shared memory segments that worker processes can map."""
+
+    def __init__(self):
+        super().__init__()
+        self._segments = {}  # id(buffer) -> SharedMemory
+        self._retired = []  # unlinked segments that still have to be closed
+
+    def _allocate(self, shape, dtype):
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        buffer = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        with self._lock:
+            self._segments[id(buffer)] = segment
+        return buffer
+
+    def _discard(self, buffer):
+        with self._lock:
+            segment = self._segments.pop(id(buffer), None)
+            if segment is not None:
+                segment.unlink()
+                self._retired.append(segment)
+            self._close_retired()
+
+    def _close_retired(self):
+        # A segment can only be closed once no array refers to its memory any more
+        still_open = []
+        for segment in self._retired:
+            try:
+                segment.close()
+            except BufferError:
+                still_open.append(segment)
+        self._retired = still_open
+
+    def segment_name(self, buffer):
+        return self._segments[id(buffer)].name
+
+    def clear(self):
+        with self._lock:
+            for buffers in self._free.values():
+                for buffer in buffers:
+                    segment = self._segments.pop(id(buffer), None)
+                    if segment is not None:
+                        segment.unlink()
+                        self._retired.append(segment)
+            self._free.clear()
+            self._close_retired()
+
+
+_attached = OrderedDict()  # segment name -> SharedMemory, in worker processes
+
+
+def _write_shared(sink, segment_name, shape, index, mode, key, image_format, save_kwargs, exif, durability):
+    segment = _attached.get(segment_name)
+    if segment is None:
+        segment = _attached[segment_name] = shared_memory.SharedMemory(name=segment_name)
+        while len(_attached) > MAX_ATTACHED_SEGMENTS:
+            _attached.popitem(last=False)[1].close()
+    pixels = np.ndarray(shape, dtype=np.uint8, buffer=segment.buf)
+    return write_image(sink, frame_image(pixels, index, mode), key, image_format, save_kwargs, exif, durability)
+
+
+def _write_now(sink, frames, index, key, image_format, save_kwargs, exif=None, durability=None):
+    future = Future()
+    try:
+        future.set_result(write_image(sink, frames[index], key, image_format, save_kwargs, exif, durability))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class SerialEncoder:
+    backend = "serial"
+
+    def __init__(self, workers=1):
+        self.workers = 1
+        self.pool = BufferPool()
+
+    def submit(self, sink, frames, index, key, image_format, save_kwargs, exif=None, durability=None):
+        return _write_now(sink, frames, index, key, image_format, save_kwargs, exif, durability)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class ThreadEncoder:
+    backend = "thread"
+
+    def __init__(self, workers=ENCODER_WORKERS):
+        self.workers = workers
+        self.pool = BufferPool()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image_encoder")
+
+    def submit(self, sink, frames, index, key, image_format, save_kwargs, exif=None, durability=None):
+        try:
+            return self._executor.submit(write_image, sink, frames[index], key, image_format, save_kwargs, exif, durability)
+        except RuntimeError:
+            # The executor is shut down at interpreter exit; queued writes still have to finish
+            return _write_now(sink, frames, index, key, image_format, save_kwargs, exif, durability)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+class ProcessEncoder:
+    backend = "process"
+
+    def __init__(self, workers=ENCODER_WORKERS):
+        self.workers = workers
+        self.pool = SharedBufferPool()
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+
+    def submit(self, sink, frames, index, key, image_format, save_kwargs, exif=None, durability=None):
+        try:
+            return self._executor.submit(
+                _write_shared,
+                sink,
+                self.pool.segment_name(frames.pixels),
+                frames.pixels.shape,
+                index,
+                frames.mode,
+                key,
+                image_format,
+                save_kwargs,
+                exif,
+                durability,
+            )
+        except RuntimeError:
+            # The executor is shut down at interpreter exit; queued writes still have to finish
+            return _write_now(sink, frames, index, key, image_format, save_kwargs, exif, durability)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        self.pool.clear()
+
+
+ENCODERS = {
+    "serial": SerialEncoder,
+    "thread": ThreadEncoder,
+    "process": ProcessEncoder,
+}
+
+
+def create_encoder(backend=ENCODER_BACKEND, workers=ENCODER_WORKERS):
+    if backend not in ENCODERS:
+        print_warning(f"Unknown encoder backend '{backend}', using 'thread'")
+        backend = "thread"
+    if backend == "process" and "fork" not in multiprocessing.get_all_start_methods():
+        print_warning("The process encoder needs the 'fork' start method, using 'thread'")
+        backend = "thread"
+    return ENCODERS[backend](workers)
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """The shared encoder configured by ENCODER_BACKEND and ENCODER_WORKERS."""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            _encoder = create_encoder()
+        return _encoder
+
+
+def benchmark(output_dir, backends=("serial", "thread", "process"), workers=(1, 2, 4, 8),
+              batch_size=16, width=768, height=768, image_format="PNG", save_kwargs=None, sink=None):
+    """
+    Encode a batch of noise images with each backend and worker count; returns rows of images/s.
+    Files go to `sink`, by default a LocalSink for `output_dir`.
+    """
+    save_kwargs = save_kwargs if save_kwargs is not None else {"compress_level": 4}
+    ext = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp"}[image_format]
+    rng = np.random.default_rng(0)
+    images = rng.random((batch_size, height, width, 3), dtype=np.float32)
+    os.makedirs(output_dir, exist_ok=True)
+    sink = sink or LocalSink(output_dir)
+
+    rows = []
+    for backend in backends:
+        for count in workers:
+            if backend == "serial" and count != 1:
+                continue
+            encoder = create_encoder(backend, count)
+            with FrameBatch(images, encoder.pool) as frames:
+                # Warm up the workers before timing
+                encoder.submit(sink, frames, 0, f"warmup.{ext}", image_format, save_kwargs).result()
+                start = time.perf_counter()
+                futures = [
+                    encoder.submit(sink, frames, i, f"bench_{i:05d}.{ext}", image_format, save_kwargs)
+                    for i in range(len(frames))
+                ]
+                for future in futures:
+                    future.result()
+                elapsed = time.perf_counter() - start
+            encoder.shutdown()
+            rows.append({"backend": encoder.backend, "workers": encoder.workers, "images_per_s": batch_size / elapsed})
+    return rows
@@ -0,0 +1,138 @@
+import os
+import re
+import threading
+import time
+
+from .atomic import PARTIAL_SUFFIX, partial_path
+
+PROCESS_START = time.time()
+# Partial files last modified this long before the process started are left over from a crash
+STALE_PARTIAL_AGE = 60
+
+
+def _compute_vars(text, image_width, image_height):
+    now = time.localtime()
+    return (
+        text.replace("%width%", str(image_width))
+        .replace("%height%", str(image_height))
+        .replace("%year%", str(now.tm_year))
+        .replace("%month%", str(now.tm_mon).zfill(2))
+        .replace("%day%", str(now.tm_mday).zfill(2))
+        .replace("%hour%", str(now.tm_hour).zfill(2))
+        .replace("%minute%", str(now.tm_min).zfill(2))
+        .replace("%second%", str(now.tm_sec).zfill(2))
+    )
+
+
+def get_save_image_path(filename_prefix, output_dir, image_width=0, image_height=0):
+    """
+    Same prefix handling as folder_paths.get_save_image_path, without listing the output folder
+    (names are picked by FilenameAllocator instead of the folder's counter).
+    Returns (full_output_folder, filename, subfolder, filename_prefix).
+    """
+    if "%" in filename_prefix:
+        filename_prefix = _compute_vars(filename_prefix, image_width, image_height)
+
+    subfolder = os.path.dirname(os.path.normpath(filename_prefix))
+    filename = os.path.basename(os.path.normpath(filename_prefix))
+    full_output_folder = os.path.join(output_dir, subfolder)
+
+    if os.path.commonpath((output_dir, os.path.abspath(full_output_folder))) != output_dir:
+        raise Exception(
+            "**** ERROR: Saving image outside the output folder is not allowed."
+            f"\n full_output_folder: {os.path.abspath(full_output_folder)}"
+            f"\n         output_dir: {output_dir}"
+        )
+    return full_output_folder, filename, subfolder, filename_prefix
+
+
+class FilenameAllocator:
+    """
+    Hands out `{name}_{index:05d}.{ext}` file names without listing the folder on every save.
+
+    Each (folder, name, ext) keeps an in-memory counter, seeded by one scan of the folder
+    the first time it is used. A name is claimed by creating its partial file (see
+    atomic.partial_path) with O_CREAT|O_EXCL, so two workers (or processes) never get the
+    same name; a taken name just moves the counter on. Partial files a crashed process
+    left behind are removed by the cold scan, so their names don't stay blocked.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def claim(path):
+        """
+        Atomically create the partial file of `path`. Returns False if `path` is taken, either
+        by a finished file or by one that is still being written.
+        """
+        partial = partial_path(path)
+        try:
+            fd = os.open(partial, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        # Checked after the claim: a writer that finished before it has already renamed its file into place
+        if os.path.exists(path):
+            os.remove(partial)
+            return False
+        return True
+
+    @staticmethod
+    def list_names(folder):
+        """Names of the entries in `folder`; only read on a cold start."""
+        try:
+            with os.scandir(folder) as entries:
+                return [entry.name for entry in entries]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def remove_stale(path):
+        """Remove the partial file at `path` if it was abandoned before this process started."""
+        try:
+            if os.path.getmtime(path) < PROCESS_START - STALE_PARTIAL_AGE:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _scan(self, folder, name, ext):
+        pattern = re.compile(rf"{re.escape(name)}_(\d+)\.{re.escape(ext)}", re.IGNORECASE)
+        partial_pattern = re.compile(rf"\.{pattern.pattern}{re.escape(PARTIAL_SUFFIX)}", re.IGNORECASE)
+        highest = 0
+        for entry in self.list_names(folder):
+            match = pattern.fullmatch(entry)
+            if match:
+                highest = max(highest, int(match.group(1)))
+            elif partial_pattern.fullmatch(entry):
+                self.remove_stale(os.path.join(folder, entry))
+        return highest
+
+    def _next_index(self, folder, name, ext):
+        key = (os.path.normcase(os.path.abspath(folder)), name, ext)
+        with self._lock:
+            index = self._counters.get(key)
+            if index is None:
+                index = self._scan(folder, name, ext) + 1
+            self._counters[key] = index + 1
+        return index
+
+    def allocate(self, folder, name, ext, preferred=None):
+        """
+        Claim a file name in `folder` and return it. `preferred` (e.g. the batch numbered
+        name) is used if it is free, otherwise the next counter name is.
+        """
+        if preferred and self.claim(os.path.join(folder, preferred)):
+            return preferred
+        while True:
+            file = f"{name}_{self._next_index(folder, name, ext):05d}.{ext}"
+            if self.claim(os.path.join(folder, file)):
+                return file
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+FILENAME_ALLOCATOR = FilenameAllocator()
@@ -0,0 +1,122 @@
+import threading
+import time
+
+from .log import print_warning
+
+TIME_BUDGET_MS = 200  # A call slower than this counts as over budget
+DEFERRED_TIME_BUDGET_MS = 30000  # Budget of deferred formatters, which may hash whole model files
+MAX_SLOW_CALLS = 3  # Over-budget calls before an extractor is disabled
+MAX_FAILURES = 3  # Exceptions before an extractor is disabled
+
+SKIPPED = object()  # Returned instead of a result when the call failed or the extractor is disabled
+
+
+class ExtractorStats:
+    __slots__ = ("calls", "total_ms", "max_ms", "slow_calls", "failures", "disabled")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_calls = 0
+        self.failures = 0
+        self.disabled = False
+
+
+class ExtractorGuard:
+    """
+    Times every selector, validator, formatter and node extractor call, and every deferred
+    value as it is resolved, and attributes it to the function's module and the node's class_type.
+
+    A running call can't be interrupted, so the budget is enforced after the fact: an
+    extractor that goes over budget MAX_SLOW_CALLS times, or raises MAX_FAILURES times,
+    is disabled until reset() and its fields are skipped. Functions of trusted modules
+    (the core rules) are timed the same way but never disabled, and their exceptions
+    propagate as they would without the guard.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._trusted_modules = set()
+        self._lock = threading.Lock()
+
+    def trust(self, *module_names):
+        """Never disable the functions of `module_names`."""
+        self._trusted_modules.update(module_names)
+
+    def call(self, func, class_type, *args, budget_ms=TIME_BUDGET_MS):
+        """Run func(*args), returning SKIPPED if it is disabled or raises."""
+        module = getattr(func, "__module__", None)
+        key = (f"{module}.{getattr(func, '__qualname__', repr(func))}", class_type)
+        trusted = module in self._trusted_modules
+        with self._lock:
+            stats = self._stats.setdefault(key, ExtractorStats())
+            if stats.disabled:
+                return SKIPPED
+
+        start = time.perf_counter()
+        error = None
+        try:
+            result = func(*args)
+        except Exception as e:
+            if trusted:
+                self._record(key, stats, start, budget_ms, True, trusted)
+                raise
+            result = SKIPPED
+            error = e
+        self._record(key, stats, start, budget_ms, error is not None, trusted)
+        if error is not None:
+            print_warning(f"{key[0]} failed on {class_type}: {error}")
+        return result
+
+    def _record(self, key, stats, start, budget_ms, failed, trusted):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            if elapsed_ms > budget_ms:
+                stats.slow_calls += 1
+            if failed:
+                stats.failures += 1
+            disable = not trusted and not stats.disabled and (
+                stats.failures >= MAX_FAILURES or stats.slow_calls >= MAX_SLOW_CALLS
+            )
+            if disable:
+                stats.disabled = True
+        if disable:
+            print_warning(
+                f"Disabled {key[0]} for {key[1]} "
+                f"({stats.failures} failures, {stats.slow_calls} calls over {budget_ms} ms)"
+            )
+
+    def get_report(self):
+        """Per-extractor cost, most expensive first."""
+        with self._lock:
+            report = [
+                {
+                    "extractor": name,
+                    "class_type": class_type,
+                    "calls": stats.calls,
+                    "total_ms": round(stats.total_ms, 3),
+                    "avg_ms": round(stats.total_ms / stats.calls, 3) if stats.calls else 0.0,
+                    "max_ms": round(stats.max_ms, 3),
+                    "slow_calls": stats.slow_calls,
+                    "failures": stats.failures,
+                    "disabled": stats.disabled,
+                }
+                for (name, class_type), stats in self._stats.items()
+            ]
+        return sorted(report, key=lambda item: item["total_ms"], reverse=True)
+
+    def reset(self, class_type=None):
+        """Forget the stats (and re-enable the extractors) of one class_type, or of all of them."""
+        with self._lock:
+            if class_type is None:
+                self._stats.clear()
+            else:
+                for key in [key for key in self._stats if key[1] == class_type]:
+                    del self._stats[key]
+
+
+EXTRACTOR_GUARD = ExtractorGuard()
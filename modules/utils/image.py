@@ -0,0 +1,111 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+
+MAX_POOLED_BUFFERS = 4  # Free buffers kept per shape
+
+FRAME_MODES = {1: "L", 3: "RGB", 4: "RGBA"}
+
+
+def frame_image(pixels, index, mode):
+    """
+    PIL image of frame `index` of a [B, H, W, C] uint8 buffer. "L" and "RGBA" frames are
+    views of the buffer; PIL stores RGB with 4 bytes per pixel, so "RGB" frames are copied
+    (about 1.6 ms for 1024x1024, next to roughly 170 ms of PNG encoding).
+    """
+    frame = pixels[index]
+    height, width = frame.shape[:2]
+    if mode == "L":
+        frame = frame[..., 0]
+    return Image.frombuffer(mode, (width, height), frame, "raw", mode, 0, 1)
+
+
+class BufferPool:
+    """Reusable numpy buffers keyed by (shape, dtype), so repeated batches of the same size don't allocate."""
+
+    def __init__(self):
+        self._free = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def _allocate(self, shape, dtype):
+        return np.empty(shape, dtype=dtype)
+
+    def _discard(self, buffer):
+        pass
+
+    def lease(self, shape, dtype):
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            if self._free[key]:
+                return self._free[key].pop()
+        return self._allocate(shape, dtype)
+
+    def release(self, buffer):
+        key = (buffer.shape, buffer.dtype.str)
+        with self._lock:
+            if len(self._free[key]) < MAX_POOLED_BUFFERS:
+                self._free[key].append(buffer)
+                return
+        self._discard(buffer)
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+
+
+BUFFER_POOL = BufferPool()
+
+
+class FrameBatch:
+    """
+    A batch of IMAGE tensors ([B, H, W, C] floats in 0..1) converted to 8-bit frames in one pass.
+
+    The batch is moved to the host once and scaled/clipped frame by frame through one
+    float scratch buffer into a pooled uint8 buffer. Values are truncated like
+    `np.clip(255. * i, 0, 255).astype(np.uint8)` in ComfyUI's SaveImage, so pixels are
+    identical. Frames are PIL images made from that buffer (views for "L" and "RGBA",
+    copies for "RGB", see frame_image), so call release() (or use the batch as a context
+    manager) only once they are no longer needed.
+    """
+
+    def __init__(self, images, pool=BUFFER_POOL):
+        self.pool = pool
+        host = images.cpu().numpy() if hasattr(images, "cpu") else np.asarray(images)
+        if host.ndim == 3:
+            host = host[..., None]
+        if host.shape[-1] not in FRAME_MODES:
+            raise ValueError(f"Unsupported number of channels: {host.shape[-1]}")
+
+        self.mode = FRAME_MODES[host.shape[-1]]
+        self.pixels = pool.lease(host.shape, np.uint8)
+        scratch = BUFFER_POOL.lease(host.shape[1:], np.float32)
+        try:
+            for frame, out in zip(host, self.pixels):
+                np.multiply(frame, 255., out=scratch, casting="unsafe")
+                np.clip(scratch, 0, 255, out=scratch)
+                np.copyto(out, scratch, casting="unsafe")
+        finally:
+            BUFFER_POOL.release(scratch)
+
+    def __len__(self):
+        return len(self.pixels) if self.pixels is not None else 0
+
+    def __getitem__(self, index):
+        return frame_image(self.pixels, index, self.mode)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def release(self):
+        if self.pixels is not None:
+            self.pool.release(self.pixels)
+            self.pixels = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,41 @@
+from .guard import DEFERRED_TIME_BUDGET_MS, EXTRACTOR_GUARD, SKIPPED
+
+
+class LazyValue:
+    """A captured value whose formatting is deferred until it is emitted.
+
+    Capture stores these in place of the formatted value for expensive
+    formatters (model hashing). Call `resolve` to compute the value once; the call goes
+    through the extractor guard, attributed to `class_type` (set by Capture).
+    """
+    __slots__ = ("_func", "_args", "_value", "_resolved", "class_type")
+
+    def __init__(self, func, *args):
+        self._func = func
+        self._args = args
+        self._value = None
+        self._resolved = False
+        self.class_type = None
+
+    def resolve(self):
+        if not self._resolved:
+            value = EXTRACTOR_GUARD.call(self._func, self.class_type, *self._args, budget_ms=DEFERRED_TIME_BUDGET_MS)
+            self._value = None if value is SKIPPED else value
+            self._resolved = True
+            self._func = self._args = None
+        return self._value
+
+    def __repr__(self):
+        state = repr(self._value) if self._resolved else "pending"
+        return f"LazyValue({state})"
+
+
+def resolve(value):
+    """Return the concrete value behind `value`, computing it if it is lazy."""
+    return value.resolve() if isinstance(value, LazyValue) else value
+
+
+def deferred(func):
+    """Mark a format function as expensive, so Capture defers it until its value is selected."""
+    func.deferred = True
+    return func
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from .prompt_text import analyze_prompt, clean_lora_name
+
+MANIFEST_NAME = "manifest.jsonl"  # Written to the output directory
+MANIFEST_MAX_BYTES = 64 * 1024 * 1024  # Rotated to manifest.jsonl.1, .2, ... past this size
+MANIFEST_BACKUPS = 5
+
+LORA_FIELD_PATTERN = re.compile(r"Lora_(\d+) (name|hash)")
+
+
+def _number(value):
+    """Seeds, steps and CFG are kept as text in pnginfo dicts; store them as numbers when they are."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text or None
+
+
+def build_record(pnginfo_dict):
+    """
+    The part of a manifest record shared by every image of a batch, taken from its pnginfo dict:
+    seed, sampling settings, model, LoRAs, resource hashes and prompts.
+    """
+    pnginfo_dict = pnginfo_dict or {}
+    positive = pnginfo_dict.get("Positive prompt")
+
+    # LoRAs are found in three places: <lora:...> tags of the prompt, "Lora hashes" and the "Lora_N" fields
+    loras = {}
+
+    def add_lora(name, **fields):
+        lora = loras.setdefault(clean_lora_name(str(name)), {"hash": None, "weight": None})
+        lora.update((k, v) for k, v in fields.items() if v is not None)
+
+    if isinstance(positive, str):
+        for tag in analyze_prompt(positive).lora_tags:
+            add_lora(tag.clean_name, weight=tag.weight)
+    for entry in str(pnginfo_dict.get("Lora hashes") or "").strip('"').split(","):
+        name, _, lora_hash = entry.partition(":")
+        if name.strip() and lora_hash.strip():
+            add_lora(name.strip(), hash=lora_hash.strip())
+    numbered = {}
+    for key, value in pnginfo_dict.items():
+        match = LORA_FIELD_PATTERN.fullmatch(key)
+        if match:
+            numbered.setdefault(int(match.group(1)), {})[match.group(2)] = value
+    for _, lora in sorted(numbered.items()):
+        if lora.get("name"):
+            add_lora(lora["name"], hash=lora.get("hash"))
+
+    try:
+        hashes = json.loads(pnginfo_dict["Hashes"]) if pnginfo_dict.get("Hashes") else {}
+    except (TypeError, ValueError):
+        hashes = {}
+
+    return {
+        "seed": _number(pnginfo_dict.get("Seed")),
+        "steps": _number(pnginfo_dict.get("Steps")),
+        "cfg": _number(pnginfo_dict.get("CFG scale")),
+        "sampler": pnginfo_dict.get("Sampler"),
+        "model": pnginfo_dict.get("Model"),
+        "model_hash": pnginfo_dict.get("Model hash"),
+        "loras": [{"name": name, **lora} for name, lora in loras.items()],
+        "hashes": hashes,
+        "positive": positive,
+        "negative": pnginfo_dict.get("Negative prompt"),
+    }
+
+
+class Manifest:
+    """
+    Append-only JSONL file with one record per saved image, so ingestion jobs can tail it
+    instead of listing output folders and opening every file.
+    Rotation is handled by a RotatingFileHandler, which also serializes the appends.
+    """
+
+    def __init__(self, path, max_bytes=MANIFEST_MAX_BYTES, backups=MANIFEST_BACKUPS):
+        self.path = path
+        self._logger = logging.Logger(f"image_metadata_manifest:{path}")
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger.addHandler(handler)
+
+    def append(self, key, size, image_format, record, **extra):
+        """Append the record of the image saved under `key`; `record` comes from build_record()."""
+        entry = {"time": round(time.time(), 3), "path": key, "size": size, "format": image_format, **extra, **record}
+        self._logger.info(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(output_dir):
+    """The shared manifest of `output_dir`."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with _manifests_lock:
+        manifest = _manifests.get(path)
+        if manifest is None:
+            manifest = _manifests[path] = Manifest(path)
+        return manifest
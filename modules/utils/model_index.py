@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+
+import folder_paths
+
+from .log import print_warning
+
+REFRESH_INTERVAL = 2.0  # Seconds between directory mtime checks on cache hits
+
+
+def _normalize(name):
+    return name.replace("\\", "/").strip("/")
+
+
+class ModelCatalog:
+    """
+    In-memory name -> path index of the model files for one folder type.
+
+    Every file is keyed by its relative path and by its relative path without
+    extension (exact keys, first configured directory wins, like
+    folder_paths.get_full_path), and by its basename and stem (loose keys, used
+    only when no exact key matches). The index is rebuilt when the mtime of any
+    indexed directory, or the list of configured directories, changes. A name that
+    isn't found is remembered as missing for REFRESH_INTERVAL seconds (or until the index
+    is rebuilt), so workflows naming a file that isn't on disk don't restat every
+    directory on every save.
+    """
+
+    def __init__(self, folder_type):
+        self.folder_type = folder_type
+        self._exact = {}
+        self._loose = {}
+        self._base_dirs = None
+        self._dir_mtimes = {}
+        self._misses = {}  # key -> time of the lookup that missed it
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _extensions(self):
+        map_legacy = getattr(folder_paths, "map_legacy", lambda name: name)
+        try:
+            extensions = folder_paths.folder_names_and_paths[map_legacy(self.folder_type)][1]
+        except (KeyError, IndexError, TypeError):
+            extensions = None
+        return {ext.lower() for ext in (extensions or folder_paths.supported_pt_extensions)}
+
+    def _get_base_dirs(self):
+        try:
+            return list(folder_paths.get_folder_paths(self.folder_type))
+        except Exception:
+            return []
+
+    def _build(self):
+        exact, loose, dir_mtimes = {}, {}, {}
+        extensions = self._extensions()
+        base_dirs = self._get_base_dirs()
+
+        for base_dir in base_dirs:
+            if not os.path.isdir(base_dir):
+                continue
+            for root, _, files in os.walk(base_dir, followlinks=True):
+                try:
+                    dir_mtimes[root] = os.stat(root).st_mtime
+                except OSError:
+                    continue
+                for file in files:
+                    stem, ext = os.path.splitext(file)
+                    if ext.lower() not in extensions:
+                        continue
+                    path = os.path.join(root, file)
+                    rel_path = _normalize(os.path.relpath(path, base_dir))
+                    exact.setdefault(rel_path, path)
+                    exact.setdefault(os.path.splitext(rel_path)[0], path)
+                    loose.setdefault(file, path)
+                    loose.setdefault(stem, path)
+
+        self._exact, self._loose = exact, loose
+        self._base_dirs = base_dirs
+        self._dir_mtimes = dir_mtimes
+        self._misses = {}
+        self._last_check = time.monotonic()
+
+    def _is_stale(self):
+        if self._base_dirs != self._get_base_dirs():
+            return True
+        for directory, mtime in self._dir_mtimes.items():
+            try:
+                if os.stat(directory).st_mtime != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _refresh(self, force=False):
+        if self._base_dirs is None:
+            self._build()
+            return
+        now = time.monotonic()
+        if not force and now - self._last_check < REFRESH_INTERVAL:
+            return
+        self._last_check = now
+        if self._is_stale():
+            self._build()
+
+    def _lookup(self, key):
+        return self._exact.get(key) or self._loose.get(key)
+
+    def resolve(self, name):
+        """Return the full path for `name` (relative path, basename or stem), or None."""
+        if not name or not isinstance(name, str):
+            return None
+        if os.path.isabs(name) and os.path.isfile(name):
+            return name
+
+        key = _normalize(name)
+        with self._lock:
+            self._refresh()
+            path = self._lookup(key)
+            if path is None:
+                missed_at = self._misses.get(key)
+                now = time.monotonic()
+                if missed_at is not None and now - missed_at < REFRESH_INTERVAL:
+                    return None
+                # The file may have been added since the last check
+                self._refresh(force=True)
+                path = self._lookup(key)
+                if path is None:
+                    self._misses[key] = now
+        return path
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_model_catalog(folder_type):
+    with _catalogs_lock:
+        catalog = _catalogs.get(folder_type)
+        if catalog is None:
+            catalog = _catalogs[folder_type] = ModelCatalog(folder_type)
+        return catalog
+
+
+def resolve_model_path(folder_type, name):
+    """Resolve a model name of the given folder type to a full path, or None if it is not found."""
+    try:
+        return get_model_catalog(folder_type).resolve(name)
+    except Exception as e:
+        print_warning(f"Failed to resolve {folder_type} '{name}': {e}")
+        return None
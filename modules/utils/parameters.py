@@ -0,0 +1,75 @@
+"""
+A1111-style "parameters" text: formatting a pnginfo dict, and parsing the text back into it.
+
+Only depends on the standard library, so tools outside ComfyUI can use it.
+"""
+import re
+
+from .prompt_text import analyze_prompt
+
+# A1111's re_param, plus unquoted JSON objects (this node writes "Hashes" that way)
+PARAM_PATTERN = re.compile(r'\s*(\w[\w \-/]+):\s*("(?:\\.|[^\\"])+"|\{[^{}]*\}|[^,]*)(?:,|$)')
+NEGATIVE_PREFIX = "Negative prompt:"
+
+
+def format_parameters(pnginfo_dict):
+    """The parameters text of a pnginfo dict: prompts on their own lines, then "Key: value" settings."""
+    if not pnginfo_dict or not isinstance(pnginfo_dict, dict):
+        return ""
+
+    def clean_value(value):
+        if value is None:
+            return ""
+        return str(value).strip().replace("\n", " ")
+
+    def strip_embedding_prefix(text):
+        return analyze_prompt(text).plain
+
+    cleaned_dict = {k: clean_value(v) for k, v in pnginfo_dict.items()}
+
+    pos = strip_embedding_prefix(cleaned_dict.get("Positive prompt", ""))
+    neg = strip_embedding_prefix(cleaned_dict.get("Negative prompt", ""))
+
+    result = [pos]
+    if neg:
+        result.append(f"{NEGATIVE_PREFIX} {neg}")
+
+    s_list = [
+        f"{k}: {v}"
+        for k, v in cleaned_dict.items()
+        if k not in {"Positive prompt", "Negative prompt"} and v not in {None, ""}
+    ]
+
+    result.append(", ".join(s_list))
+    return "\n".join(result)
+
+
+def parse_parameters(text):
+    """
+    Split parameters text into {"Positive prompt": ..., "Negative prompt": ..., "Steps": ..., ...}.
+    Values are kept as text, quoted values with their quotes, as in the pnginfo dict.
+    Returns {} for text without a "Steps" line.
+    """
+    if not text or not isinstance(text, str):
+        return {}
+
+    lines = text.strip().split("\n")
+    settings = lines.pop() if lines and "Steps:" in lines[-1] else None
+    if settings is None:
+        return {}
+
+    positive, negative = [], []
+    target = positive
+    for line in lines:
+        if line.startswith(NEGATIVE_PREFIX):
+            target = negative
+            line = line[len(NEGATIVE_PREFIX):].lstrip()
+        target.append(line)
+
+    result = {
+        "Positive prompt": "\n".join(positive).strip(),
+        "Negative prompt": "\n".join(negative).strip(),
+    }
+    for key, value in PARAM_PATTERN.findall(settings):
+        result[key.strip()] = value.strip()
+    return result
@@ -0,0 +1,49 @@
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+PROMPT_CACHE_SIZE = 256  # Distinct prompt texts kept analysed
+
+# Regex to match <lora:name:weight>, based on https://github.com/civitai/civitai/blob/main/src/utils/prompt-helpers.ts
+LORA_TAG_PATTERN = re.compile(r"<(lora|lyco):([a-zA-Z0-9_\./\\-]+):([0-9.]+)>")
+EMBEDDING_PATTERN = re.compile(r"embedding:\(?([^\s),]+)\)?")
+
+# One <lora:...> / <lyco:...> tag of a prompt
+LoraTag = namedtuple("LoraTag", ["tag", "name", "weight", "clean_name"])
+
+# Everything derived from a single prompt text
+PromptAnalysis = namedtuple("PromptAnalysis", [
+    "has_lora_tags",    # "<lora:" appears in the text, case-insensitively
+    "lora_tags",        # tuple of LoraTag, in order of appearance
+    "embedding_names",  # tuple of embedding names, in order of appearance
+    "rewritten",        # the text with LoRA tag names cleaned
+    "plain",            # the text without "embedding:" prefixes
+])
+
+
+def clean_lora_name(name):
+    return os.path.splitext(os.path.basename(name))[0].replace('\\', '_').replace('/', '_').replace(' ', '_').replace(':', '_')
+
+
+def _rewrite_tag(match):
+    tag, raw_name, weight = match.group(1), match.group(2), match.group(3)
+    return f"<{tag}:{clean_lora_name(raw_name)}:{weight}>"
+
+
+@lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def analyze_prompt(text):
+    """Parse a prompt text once; repeated prompts are served from the cache."""
+    flat = text.replace("\n", " ").replace("\r", " ")
+    lora_tags = tuple(
+        LoraTag(tag, name, float(weight), clean_lora_name(name))
+        for tag, name, weight in LORA_TAG_PATTERN.findall(flat)
+    )
+    embedding_names = tuple(EMBEDDING_PATTERN.findall(text)) if "embedding:" in text else ()
+    return PromptAnalysis(
+        has_lora_tags="<lora:" in flat.lower(),
+        lora_tags=lora_tags,
+        embedding_names=embedding_names,
+        rewritten=LORA_TAG_PATTERN.sub(_rewrite_tag, text) if lora_tags else text,
+        plain=text.replace("embedding:", ""),
+    )
@@ -0,0 +1,263 @@
+"""
+Reading the metadata of saved images without decoding their pixels.
+
+The containers are walked directly: PNG text chunks (tEXt, zTXt, iTXt), the EXIF APP1
+segment of JPEG files and the EXIF chunk of WebP files. Image data is skipped with
+seeks. Only the standard library is used, so tools and worker processes stay light.
+"""
+import json
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .parameters import parse_parameters
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+JSON_KEYS = ("prompt", "workflow")  # PNG text chunks holding JSON
+READ_CHUNK_SIZE = 64  # Files per task of the process pool
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+EXIF_HEADER = b"Exif\x00\x00"
+EXIF_IFD_POINTER = 0x8769
+USER_COMMENT = 0x9286
+# UserComment starts with an 8 byte character code (see piexif.helper.UserComment)
+USER_COMMENT_ENCODINGS = {
+    b"ASCII\x00\x00\x00": "ascii",
+    b"UNICODE\x00": "utf_16_be",
+    b"JIS\x00\x00\x00\x00\x00": "shift_jis",
+}
+
+
+def _read_png(f):
+    f.seek(len(PNG_SIGNATURE))
+    texts = {}
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type in (b"tEXt", b"zTXt", b"iTXt"):
+            data = f.read(length)
+            key, _, value = data.partition(b"\x00")
+            if chunk_type == b"tEXt":
+                text = value.decode("latin-1")
+            elif chunk_type == b"zTXt":
+                text = zlib.decompress(value[1:]).decode("latin-1")
+            else:
+                compressed = value[0]
+                _language, _, rest = value[2:].partition(b"\x00")
+                _translated, _, value = rest.partition(b"\x00")
+                text = (zlib.decompress(value) if compressed else value).decode("utf-8")
+            texts[key.decode("latin-1")] = text
+            f.seek(4, os.SEEK_CUR)  # CRC
+        elif chunk_type == b"IEND":
+            break
+        else:
+            f.seek(length + 4, os.SEEK_CUR)  # IDAT and other chunks, CRC
+    return texts
+
+
+def _user_comment(exif):
+    """The UserComment text of EXIF data (TIFF, optionally after the "Exif" header), or None."""
+    if exif.startswith(EXIF_HEADER):
+        exif = exif[len(EXIF_HEADER):]
+    if exif[:2] not in (b"II", b"MM"):
+        return None
+    order = "<" if exif[:2] == b"II" else ">"
+
+    def find_entry(ifd_offset, tag):
+        count = struct.unpack_from(order + "H", exif, ifd_offset)[0]
+        for i in range(count):
+            entry_tag, entry_type, value_count, value = struct.unpack_from(order + "HHI4s", exif, ifd_offset + 2 + 12 * i)
+            if entry_tag == tag:
+                return entry_type, value_count, value
+        return None
+
+    exif_pointer = find_entry(struct.unpack_from(order + "I", exif, 4)[0], EXIF_IFD_POINTER)
+    if exif_pointer is None:
+        return None
+    comment = find_entry(struct.unpack_from(order + "I", exif_pointer[2])[0], USER_COMMENT)
+    if comment is None:
+        return None
+    _, count, value = comment
+    data = value[:count] if count <= 4 else exif[struct.unpack(order + "I", value)[0]:][:count]
+    encoding = USER_COMMENT_ENCODINGS.get(data[:8])
+    return data[8:].decode(encoding or "utf-8", errors="replace").rstrip("\x00")
+
+
+def jpeg_segments(f):
+    """
+    (marker, offset, length) of the segments of a JPEG file up to the start of scan, where
+    offset and length are those of the segment data.
+    """
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue  # markers without a length
+        if marker[1] in (0xDA, 0xD9):
+            return  # start of scan, end of image: no metadata past this point
+        length = struct.unpack(">H", f.read(2))[0] - 2
+        offset = f.tell()
+        yield marker[1], offset, length
+        f.seek(offset + length)
+
+
+def webp_chunks(f):
+    """(fourcc, offset, size) of the chunks of a WebP file; offset and size are those of the chunk data."""
+    f.seek(12)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        fourcc, size = struct.unpack("<4sI", header)
+        offset = f.tell()
+        yield fourcc, offset, size
+        f.seek(offset + size + (size & 1))
+
+
+def _read_jpeg_exif(f):
+    for marker, offset, length in jpeg_segments(f):
+        if marker == 0xE1:
+            f.seek(offset)
+            data = f.read(length)
+            if data.startswith(EXIF_HEADER):
+                return data
+    return None
+
+
+def _read_webp_exif(f):
+    for fourcc, offset, size in webp_chunks(f):
+        if fourcc == b"EXIF":
+            f.seek(offset)
+            return f.read(size)
+    return None
+
+
+def _exif_texts(exif):
+    comment = _user_comment(exif) if exif else None
+    return {"parameters": comment} if comment is not None else {}
+
+
+def image_format(head):
+    """PNG, JPEG or WEBP from the first 12 bytes of a file, or None."""
+    if head.startswith(PNG_SIGNATURE):
+        return "PNG"
+    if head.startswith(b"\xff\xd8"):
+        return "JPEG"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def read_exif(path):
+    """(format, raw EXIF data or None) of a JPEG or WebP file; PNG files give (format, None)."""
+    with open(path, "rb") as f:
+        fmt = image_format(f.read(12))
+        if fmt == "JPEG":
+            return fmt, _read_jpeg_exif(f)
+        if fmt == "WEBP":
+            return fmt, _read_webp_exif(f)
+    return fmt, None
+
+
+def read_metadata(path):
+    """
+    (format, texts) of an image: texts maps PNG text chunk keys to their text, or holds
+    the EXIF UserComment of a JPEG/WebP file as "parameters". Format is None for other files.
+    """
+    with open(path, "rb") as f:
+        fmt = image_format(f.read(12))
+        if fmt == "PNG":
+            return fmt, _read_png(f)
+        if fmt == "JPEG":
+            return fmt, _exif_texts(_read_jpeg_exif(f))
+        if fmt == "WEBP":
+            return fmt, _exif_texts(_read_webp_exif(f))
+    return None, {}
+
+
+def read_parameters(path):
+    """The parameters text of a PNG ("parameters" chunk) or JPEG/WebP (EXIF UserComment), or None."""
+    return read_metadata(path)[1].get("parameters")
+
+
+def read_record(path, root=None, raw=False):
+    """
+    A JSON-ready record of one image: its path (relative to `root`), format and size,
+    "parameters" parsed back into the pnginfo dict keys (see parse_parameters), and the
+    "prompt"/"workflow" JSON chunks. With `raw`, the parameters text is kept as well.
+    Read errors are returned in "error".
+    """
+    record = {"path": os.path.relpath(path, root).replace(os.sep, "/") if root else path}
+    try:
+        record["size"] = os.path.getsize(path)
+        fmt, texts = read_metadata(path)
+    except (OSError, ValueError, struct.error, zlib.error) as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        return record
+
+    record["format"] = fmt
+    text = texts.pop("parameters", None)
+    if text is not None:
+        record["parameters"] = parse_parameters(text)
+        if raw:
+            record["parameters_text"] = text
+    for key in JSON_KEYS:
+        if key in texts:
+            try:
+                record[key] = json.loads(texts.pop(key))
+            except ValueError:
+                record[key] = None
+    if texts:
+        record["text"] = texts
+    return record
+
+
+def iter_image_paths(root):
+    """Image files under `root`, in a stable order; hidden files and folders are skipped."""
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for file in sorted(files):
+            if not file.startswith(".") and file.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(folder, file)
+
+
+def _read_records(paths, root, raw):
+    return [read_record(path, root, raw) for path in paths]
+
+
+def _batches(paths, size):
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_records(paths, root=None, raw=False, workers=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    Records of `paths` in order, read by a process pool. Only a few chunks per worker
+    are in flight at a time, so `paths` can be a lazy walk over millions of files.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for path in paths:
+            yield read_record(path, root, raw)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in _batches(paths, chunk_size):
+            pending.append(executor.submit(_read_records, batch, root, raw))
+            if len(pending) >= 4 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
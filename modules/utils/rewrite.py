@@ -0,0 +1,246 @@
+"""
+Replacing the metadata of saved images without re-encoding them.
+
+PNG files get new text chunks; every other chunk, IDAT included, is copied verbatim.
+JPEG files get a new EXIF APP1 segment and WebP files a new EXIF chunk, with the
+UserComment replaced and the other EXIF tags kept; the compressed image data is copied
+as is, so nothing is lost. Files are streamed, and written atomically (see atomic.py).
+"""
+import io
+import os
+import struct
+import zlib
+
+import piexif
+import piexif.helper
+
+from .atomic import discard, finish, get_durability, partial_path
+from .parameters import format_parameters, parse_parameters
+from .reader import EXIF_HEADER, PNG_SIGNATURE, jpeg_segments, read_exif, read_metadata, webp_chunks
+
+COPY_BUFFER_SIZE = 1024 * 1024
+MAX_APP1_SIZE = 65533  # Largest EXIF segment a JPEG file can hold
+VP8X_EXIF_FLAG = 0x08
+
+
+def _copy(src, dst, size):
+    while size > 0:
+        data = src.read(min(size, COPY_BUFFER_SIZE))
+        if not data:
+            raise ValueError("Unexpected end of file")
+        dst.write(data)
+        size -= len(data)
+
+
+def _png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+
+
+def png_text_chunk(key, text, compressed=False):
+    """A tEXt/zTXt chunk, or iTXt for text that isn't Latin-1, like PngInfo.add_text."""
+    key = key.encode("latin-1")
+    try:
+        data = text.encode("latin-1")
+        if compressed:
+            return _png_chunk(b"zTXt", key + b"\x00\x00" + zlib.compress(data))
+        return _png_chunk(b"tEXt", key + b"\x00" + data)
+    except UnicodeEncodeError:
+        data = text.encode("utf-8")
+        if compressed:
+            data = zlib.compress(data)
+        return _png_chunk(b"iTXt", key + b"\x00" + bytes([int(compressed), 0]) + b"\x00\x00" + data)
+
+
+def rewrite_png(src, dst, texts):
+    """
+    Copy PNG `src` to `dst` (binary files) with the text chunks of `texts` replaced; a None
+    value removes the key. Replaced chunks keep their place and compression, new ones go
+    before the image data.
+    """
+    dst.write(PNG_SIGNATURE)
+    src.seek(len(PNG_SIGNATURE))
+    pending = dict(texts)
+
+    def write_pending():
+        for key, text in pending.items():
+            if text is not None:
+                dst.write(png_text_chunk(key, text))
+        pending.clear()
+
+    while True:
+        header = src.read(8)
+        if len(header) < 8:
+            raise ValueError("PNG file ends without IEND")
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type in (b"tEXt", b"zTXt", b"iTXt"):
+            data = src.read(length)
+            crc = src.read(4)
+            key = data.partition(b"\x00")[0].decode("latin-1")
+            if key not in texts:
+                dst.write(header + data + crc)
+            elif key in pending:
+                text = pending.pop(key)
+                if text is not None:
+                    compressed = chunk_type == b"zTXt" or (chunk_type == b"iTXt" and data[len(key) + 1] == 1)
+                    dst.write(png_text_chunk(key, text, compressed))
+            continue
+        if chunk_type in (b"IDAT", b"IEND"):
+            write_pending()
+        dst.write(header)
+        _copy(src, dst, length + 4)
+        if chunk_type == b"IEND":
+            return
+
+
+def rewrite_jpeg(src, dst, exif):
+    """Copy JPEG `src` to `dst` with its EXIF segment replaced by `exif` (bytes starting with the Exif header)."""
+    if len(exif) > MAX_APP1_SIZE:
+        raise ValueError(f"EXIF data of {len(exif)} bytes doesn't fit in a JPEG APP1 segment")
+    segments = list(jpeg_segments(src))
+    app1 = b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+
+    src.seek(0)
+    dst.write(src.read(2))  # SOI
+    position = 2
+    written = False
+    for marker, offset, length in segments:
+        start = offset - 4  # marker and length
+        # Markers without a length (fill bytes, RST) between segments are copied along
+        _copy(src, dst, start - position)
+        src.seek(start)
+        is_exif = False
+        if marker == 0xE1:
+            src.seek(offset)
+            is_exif = src.read(len(EXIF_HEADER)) == EXIF_HEADER
+            src.seek(start)
+        if not written and (is_exif or marker != 0xE0):
+            dst.write(app1)
+            written = True
+        if is_exif:
+            src.seek(offset + length)
+        else:
+            _copy(src, dst, length + 4)
+        position = offset + length
+    if not written:
+        dst.write(app1)
+    # Start of scan onwards
+    src.seek(position)
+    while True:
+        data = src.read(COPY_BUFFER_SIZE)
+        if not data:
+            return
+        dst.write(data)
+
+
+def rewrite_webp(src, dst, exif):
+    """Copy WebP `src` to `dst` with its EXIF chunk replaced by `exif` (TIFF data, Exif header optional)."""
+    if exif.startswith(EXIF_HEADER):
+        exif = exif[len(EXIF_HEADER):]
+    chunks = list(webp_chunks(src))
+    if not chunks or chunks[0][0] != b"VP8X":
+        # Simple format files need a VP8X header built from the bitstream first; piexif knows how
+        src.seek(0)
+        output = io.BytesIO()
+        piexif.insert(EXIF_HEADER + exif, src.read(), output)
+        dst.write(output.getvalue())
+        return
+
+    exif_chunk = b"EXIF" + struct.pack("<I", len(exif)) + exif + b"\x00" * (len(exif) & 1)
+    body = []  # (fourcc, offset, size) of the chunks to copy, EXIF goes before XMP or last
+    for fourcc, offset, size in chunks:
+        if fourcc != b"EXIF":
+            body.append((fourcc, offset, size))
+    riff_size = 4 + sum(8 + size + (size & 1) for _, _, size in body) + len(exif_chunk)
+
+    dst.write(b"RIFF" + struct.pack("<I", riff_size) + b"WEBP")
+    written = False
+    for fourcc, offset, size in body:
+        if fourcc == b"XMP " and not written:
+            dst.write(exif_chunk)
+            written = True
+        src.seek(offset - 8)
+        if fourcc == b"VP8X":
+            data = bytearray(src.read(8 + size + (size & 1)))
+            data[8] |= VP8X_EXIF_FLAG
+            dst.write(data)
+        else:
+            _copy(src, dst, 8 + size + (size & 1))
+    if not written:
+        dst.write(exif_chunk)
+
+
+def exif_with_comment(exif, text):
+    """`exif` (raw EXIF data or None) with its UserComment set to `text`, dumped by piexif."""
+    comment = piexif.helper.UserComment.dump(text, encoding="unicode")
+    if exif:
+        try:
+            exif_dict = piexif.load(exif if exif.startswith(EXIF_HEADER) else EXIF_HEADER + exif)
+            exif_dict.setdefault("Exif", {})[piexif.ExifIFD.UserComment] = comment
+            return piexif.dump(exif_dict)
+        except (ValueError, struct.error, KeyError, TypeError):
+            pass  # Tags piexif can't round-trip; keep only the comment
+    return piexif.dump({"Exif": {piexif.ExifIFD.UserComment: comment}})
+
+
+def rewrite_metadata(src, dst=None, parameters=None, texts=None, durability=None, keep_times=True):
+    """
+    Replace the metadata of the image at `src` and write it to `dst` (default: `src`, in place).
+    `parameters` is the new parameters text. For PNG files `texts` can replace other text
+    chunks too (a None value removes one); JPEG and WebP files only hold the parameters.
+    The file's access and modification times are kept unless `keep_times` is False.
+    """
+    dst = dst or src
+    texts = dict(texts or {})
+    if parameters is not None:
+        texts["parameters"] = parameters
+    durability = durability or get_durability()
+    stat = os.stat(src)
+
+    fmt, exif = read_exif(src)
+    if fmt in ("JPEG", "WEBP"):
+        if set(texts) - {"parameters"}:
+            raise ValueError(f"{fmt} files only hold the parameters text")
+        if "parameters" not in texts:
+            return
+        exif = exif_with_comment(exif, texts["parameters"] or "")
+
+    try:
+        with open(src, "rb") as f, open(partial_path(dst), "wb") as out:
+            if fmt == "PNG":
+                rewrite_png(f, out, texts)
+            elif fmt == "JPEG":
+                rewrite_jpeg(f, out, exif)
+            elif fmt == "WEBP":
+                rewrite_webp(f, out, exif)
+            else:
+                raise ValueError(f"{src} is not a PNG, JPEG or WebP file")
+        if keep_times:
+            os.utime(partial_path(dst), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        finish(dst, "file" if durability == "batch" else durability)
+    except BaseException:
+        discard(dst)
+        raise
+
+
+def update_parameters(src, changes, dst=None):
+    """
+    Apply `changes` to the parameters of an image and rewrite it with rewrite_metadata().
+    `changes` maps keys of the pnginfo dict ("Seed", "Lora hashes", "Positive prompt", ...)
+    to new values (None removes one), or is a function taking and returning the dict.
+    The text is formatted like Capture.gen_parameters_str. Returns the new dict, or None
+    (and leaves the file alone) when the image has no parameters.
+    """
+    _, texts = read_metadata(src)
+    pnginfo_dict = parse_parameters(texts.get("parameters"))
+    if not pnginfo_dict:
+        return None
+    if callable(changes):
+        pnginfo_dict = changes(pnginfo_dict)
+    else:
+        for key, value in changes.items():
+            if value is None:
+                pnginfo_dict.pop(key, None)
+            else:
+                pnginfo_dict[key] = value
+    rewrite_metadata(src, dst, parameters=format_parameters(pnginfo_dict))
+    return pnginfo_dict
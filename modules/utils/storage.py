@@ -0,0 +1,277 @@
+"""
+Storage sinks for saved images and their sidecar files.
+
+Encoders hand a sink the encoded bytes of a file under a key, a "/" separated path
+relative to the output directory. Sinks pick the file names too, since only they know
+which names are taken:
+  - "local": files in the output directory, written atomically (see atomic.py).
+  - "null": counts files and bytes and drops them, to benchmark the pipeline without I/O.
+  - "memory": keeps the files in a dict.
+  - "s3": objects in an S3 compatible bucket (needs boto3). Large files are uploaded in
+    parts, and one client, with its connection pool, is shared per process.
+Worker processes of the process encoder get a pickled copy of the sink; memory sink
+contents written there stay in the worker.
+"""
+import abc
+import io
+import os
+import posixpath
+import threading
+
+from .atomic import discard, finish, finish_batch, partial_path
+from .filenames import FILENAME_ALLOCATOR, FilenameAllocator
+from .log import print_warning
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+except ImportError:
+    boto3 = None
+
+STORAGE_SINK = "local"  # "local", "null", "memory" or "s3"
+
+S3_BUCKET = ""
+S3_PREFIX = ""  # Prepended to every key, e.g. "comfyui/outputs"
+S3_ENDPOINT_URL = None  # e.g. "http://localhost:9000" for MinIO or another local stand-in
+S3_REGION = None
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024  # Files from this size are uploaded in parts
+S3_PART_SIZE = 8 * 1024 * 1024
+S3_MAX_CONNECTIONS = 10  # Connection pool size, also the number of parts uploaded at once
+
+
+def to_key(*parts):
+    """Join path parts into a normalized "/" separated key."""
+    key = posixpath.normpath("/".join(part.replace(os.sep, "/") for part in parts if part))
+    return "" if key == "." else key
+
+
+class KeyAllocator(FilenameAllocator):
+    """
+    FilenameAllocator for sinks without a local folder. Each folder is listed once through
+    `list_names`; names are claimed in memory, so only within this process.
+    """
+
+    def __init__(self, list_names=None):
+        super().__init__()
+        self._list_names = list_names
+        self._taken = {}  # folder -> names that exist or were handed out
+
+    def list_names(self, folder):
+        # Called with the lock held; also seeds the counters, so each folder is listed once
+        taken = self._taken.get(folder)
+        if taken is None:
+            taken = self._taken[folder] = set(self._list_names(folder) if self._list_names else ())
+        return taken
+
+    @staticmethod
+    def remove_stale(path):
+        pass  # Names are claimed in memory; there are no partial files to clean up
+
+    def claim(self, path):
+        folder, file = os.path.split(path)
+        with self._lock:
+            taken = self.list_names(folder)
+            if file in taken:
+                return False
+            taken.add(file)
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._taken.clear()
+
+
+class StorageSink(abc.ABC):
+    """
+    Base class of the sinks. allocate() runs in the process that saves the batch,
+    write() wherever the file was encoded.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.allocator = KeyAllocator()
+
+    def allocate(self, folder, name, ext, preferred=None):
+        """Claim a file name in `folder` (a key) and return it."""
+        return self.allocator.allocate(to_key(folder), name, ext, preferred)
+
+    @abc.abstractmethod
+    def write(self, key, data, content_type=None, metadata=None, durability=None):
+        """Store `data` (bytes-like) under `key`. Returns the number of bytes written."""
+
+    def finish_batch(self, keys):
+        """Complete the writes of a batch saved with "batch" durability."""
+
+    def discard(self, key):
+        """Release the name allocated for `key` when its file won't be written after all."""
+
+    def __getstate__(self):
+        # Worker processes only write; names are allocated by the saving process
+        state = self.__dict__.copy()
+        state.pop("allocator", None)
+        state.pop("_lock", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class LocalSink(StorageSink):
+    name = "local"
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def allocate(self, folder, name, ext, preferred=None):
+        folder = self.path(to_key(folder))
+        os.makedirs(folder, exist_ok=True)
+        return FILENAME_ALLOCATOR.allocate(folder, name, ext, preferred)
+
+    def write(self, key, data, content_type=None, metadata=None, durability=None):
+        path = self.path(key)
+        try:
+            with open(partial_path(path), "wb") as f:
+                f.write(data)
+            finish(path, durability)
+        except BaseException:
+            discard(path)
+            raise
+        return len(data)
+
+    def finish_batch(self, keys):
+        finish_batch([self.path(key) for key in keys])
+
+    def discard(self, key):
+        discard(self.path(key))
+
+
+class MemorySink(StorageSink):
+    """Keeps written files in `files`, or with keep=False only counts them."""
+
+    name = "memory"
+
+    def __init__(self, root=None, keep=True):
+        super().__init__()
+        self.keep = keep
+        self.files = {}
+        self.count = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def write(self, key, data, content_type=None, metadata=None, durability=None):
+        size = len(data)
+        with self._lock:
+            self.count += 1
+            self.bytes += size
+            if self.keep:
+                self.files[key] = bytes(data)
+        return size
+
+
+class NullSink(MemorySink):
+    name = "null"
+
+    def __init__(self, root=None):
+        super().__init__(root, keep=False)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class S3Sink(StorageSink):
+    name = "s3"
+
+    def __init__(self, root=None, bucket=None, prefix=None, endpoint_url=None, region=None):
+        if boto3 is None:
+            raise ImportError("boto3 is not installed")
+        super().__init__()
+        self.bucket = bucket or S3_BUCKET
+        if not self.bucket:
+            raise ValueError("S3_BUCKET is not set")
+        self.prefix = to_key(prefix if prefix is not None else S3_PREFIX)
+        self.endpoint_url = endpoint_url or S3_ENDPOINT_URL
+        self.region = region or S3_REGION
+        self.allocator = KeyAllocator(self._list_names)
+
+    @property
+    def client(self):
+        """One client per process and endpoint; boto3 clients are thread safe and pool their connections."""
+        key = (os.getpid(), self.endpoint_url, self.region)
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = boto3.session.Session().client(
+                    "s3",
+                    endpoint_url=self.endpoint_url,
+                    region_name=self.region,
+                    config=Config(max_pool_connections=S3_MAX_CONNECTIONS, retries={"mode": "standard"}),
+                )
+            return client
+
+    def object_key(self, key):
+        return to_key(self.prefix, key)
+
+    def _list_names(self, folder):
+        prefix = self.object_key(folder)
+        prefix = prefix + "/" if prefix else ""
+        names = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter="/"):
+            names.extend(item["Key"][len(prefix):] for item in page.get("Contents", []))
+        return names
+
+    def write(self, key, data, content_type=None, metadata=None, durability=None):
+        # An object only becomes visible once its upload is complete, so durability needs no extra steps
+        extra_args = {}
+        if content_type:
+            extra_args["ContentType"] = content_type
+        if metadata:
+            extra_args["Metadata"] = {str(k): str(v) for k, v in metadata.items()}
+        config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_PART_SIZE,
+            max_concurrency=S3_MAX_CONNECTIONS,
+        )
+        self.client.upload_fileobj(io.BytesIO(data), self.bucket, self.object_key(key), ExtraArgs=extra_args, Config=config)
+        return len(data)
+
+
+SINKS = {
+    "local": LocalSink,
+    "null": NullSink,
+    "memory": MemorySink,
+    "s3": S3Sink,
+}
+
+
+def create_sink(name=STORAGE_SINK, root=None):
+    if name not in SINKS:
+        print_warning(f"Unknown storage sink '{name}', using 'local'")
+        name = "local"
+    try:
+        return SINKS[name](root)
+    except (ImportError, ValueError) as e:
+        print_warning(f"Can't use the {name} storage sink ({e}), using 'local'")
+        return LocalSink(root)
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def get_sink(root):
+    """The shared sink configured by STORAGE_SINK for the output directory `root`."""
+    with _sinks_lock:
+        sink = _sinks.get((STORAGE_SINK, root))
+        if sink is None:
+            sink = _sinks[(STORAGE_SINK, root)] = create_sink(STORAGE_SINK, root)
+        return sink
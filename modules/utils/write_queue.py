@@ -0,0 +1,96 @@
+import atexit
+import queue
+import threading
+import time
+
+from .log import print_error, print_warning
+
+WRITE_QUEUE_SIZE = 8  # Batches waiting to be written before save_images blocks
+
+
+class WriteQueue:
+    """
+    Write-behind queue for image batches.
+
+    Jobs run in order on one background thread (the encoder still spreads each batch
+    over its workers). put() blocks while the queue is full, which holds back the
+    execution thread instead of letting pending batches pile up in memory.
+    """
+
+    def __init__(self, maxsize=WRITE_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.last_failure = None  # {"time", "description", "error"} of the most recent failed job
+        self.blocked = 0  # put() calls that had to wait for room
+        self.blocked_ms = 0.0
+        self.total_latency_ms = 0.0  # time from put() to the end of the job
+        self.max_latency_ms = 0.0
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="image_write_queue", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job, description, queued_at = self._queue.get()
+            try:
+                job()
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                self.last_failure = {"time": time.time(), "description": description, "error": f"{type(e).__name__}: {e}"}
+                print_error(f"Failed to write {description} ({self.failed} failed write(s) so far): {e}")
+            finally:
+                latency_ms = (time.perf_counter() - queued_at) * 1000
+                self.total_latency_ms += latency_ms
+                self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+                self._queue.task_done()
+
+    def put(self, job, description="image batch"):
+        """Queue `job` (a callable), waiting for room if the queue is full."""
+        self._ensure_worker()
+        item = (job, description, time.perf_counter())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put(item)
+            self.blocked += 1
+            self.blocked_ms += (time.perf_counter() - start) * 1000
+        self.enqueued += 1
+
+    def flush(self):
+        """Wait until every queued job has been written."""
+        pending = self._queue.unfinished_tasks
+        if pending:
+            print_warning(f"Waiting for {pending} queued image batch(es) to be written")
+        self._queue.join()
+
+    def backlog(self):
+        """Batches waiting to start; the one being written doesn't count."""
+        return self._queue.qsize()
+
+    def get_stats(self):
+        finished = self.completed + self.failed
+        return {
+            "depth": self._queue.qsize(),
+            "pending": self._queue.unfinished_tasks,
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "last_failure": self.last_failure,
+            "blocked": self.blocked,
+            "blocked_ms": round(self.blocked_ms, 3),
+            "avg_latency_ms": round(self.total_latency_ms / finished, 3) if finished else 0.0,
+            "max_latency_ms": round(self.max_latency_ms, 3),
+        }
+
+
+WRITE_QUEUE = WriteQueue()
+atexit.register(WRITE_QUEUE.flush)
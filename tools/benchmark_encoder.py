@@ -0,0 +1,50 @@
+"""
+Images/s of the serial, thread and process encoders for different worker counts.
+
+    python tools/benchmark_encoder.py --format PNG --batch-size 16 --workers 1 2 4 8
+
+Runs outside ComfyUI; only numpy, Pillow and piexif are needed. With --sink null nothing
+is written, which measures the conversion and encoding alone.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# modules/utils is a namespace package whose encoder only depends on its sibling modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+
+from utils.encoder import benchmark  # noqa: E402
+from utils.storage import create_sink  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--format", default="PNG", choices=["PNG", "JPEG", "WEBP"])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--width", type=int, default=768)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--backends", nargs="+", default=["serial", "thread", "process"])
+    parser.add_argument("--sink", default="local", choices=["local", "null"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        rows = benchmark(
+            output_dir,
+            backends=args.backends,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            width=args.width,
+            height=args.height,
+            image_format=args.format,
+            sink=create_sink(args.sink, output_dir),
+        )
+
+    print(f"{'backend':<10}{'workers':>8}{'images/s':>12}")
+    for row in rows:
+        print(f"{row['backend']:<10}{row['workers']:>8}{row['images_per_s']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Add existing images of an output directory to the catalog, reading their metadata.
+
+    python tools/index_outputs.py /path/to/ComfyUI/output
+
+Runs outside ComfyUI with the standard library only. Images already in the catalog
+with the same size are skipped, so it can be run again after copying in new outputs.
+"""
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules/utils is a namespace package whose catalog only depends on its sibling modules
+sys.path.insert(0, os.path.join(ROOT_DIR, "modules"))
+
+from utils.catalog import CATALOG_NAME, Catalog, backfill  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output_dir", help="ComfyUI output directory; paths are stored relative to it")
+    parser.add_argument("--db", default=os.path.join(ROOT_DIR, ".cache", CATALOG_NAME), help="catalog database")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    catalog = Catalog(args.db)
+    added = backfill(catalog, os.path.abspath(args.output_dir), progress=lambda n: print(f"{n} images added", end="\r"))
+    print(f"{added} images added to {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Read the metadata of saved images and write one JSON record per image.
+
+    python tools/read_metadata.py /path/to/ComfyUI/output --workers 8 > metadata.jsonl
+
+Pixels are never decoded: PNG text chunks and the EXIF of JPEG/WebP files are read
+straight from the files. Runs outside ComfyUI with the standard library only.
+"""
+import argparse
+import json
+import os
+import sys
+
+# modules/utils is a namespace package whose reader only depends on its sibling modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+
+from utils.reader import READ_CHUNK_SIZE, iter_image_paths, iter_records  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="image files or directories to walk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=READ_CHUNK_SIZE, help="files per worker task")
+    parser.add_argument("--raw", action="store_true", help="also output the parameters text as written")
+    parser.add_argument("--no-workflow", action="store_true", help="leave out the prompt and workflow JSON")
+    parser.add_argument("--output", "-o", help="JSONL file to write (default: stdout)")
+    args = parser.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for path in args.paths:
+            root = path if os.path.isdir(path) else None
+            paths = iter_image_paths(path) if root else [path]
+            for record in iter_records(paths, root, args.raw, args.workers, args.chunk_size):
+                if args.no_workflow:
+                    record.pop("prompt", None)
+                    record.pop("workflow", None)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
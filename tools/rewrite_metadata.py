@@ -0,0 +1,71 @@
+"""
+Change the parameters of saved images in place, without re-encoding them.
+
+    python tools/rewrite_metadata.py output/ --set "Model hash=4b2b98a7e6" --replace oldLora=newLora
+
+PNG text chunks or the JPEG/WebP EXIF are replaced; image data is copied as is, so
+JPEG and WebP files lose nothing. Runs outside ComfyUI; only piexif is needed.
+"""
+import argparse
+import os
+import sys
+
+# modules/utils is a namespace package whose rewriter only depends on its sibling modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modules"))
+
+from utils.parameters import format_parameters, parse_parameters  # noqa: E402
+from utils.reader import iter_image_paths, read_parameters  # noqa: E402
+from utils.rewrite import update_parameters  # noqa: E402
+
+
+def key_value(text):
+    key, sep, value = text.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got '{text}'")
+    return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="image files or directories to walk")
+    parser.add_argument("--set", type=key_value, action="append", default=[], metavar="KEY=VALUE",
+                        help='set a parameter, e.g. "Model hash=4b2b98a7e6"')
+    parser.add_argument("--unset", action="append", default=[], metavar="KEY", help="remove a parameter")
+    parser.add_argument("--replace", type=key_value, action="append", default=[], metavar="OLD=NEW",
+                        help="replace text in every parameter value, e.g. a LoRA name")
+    parser.add_argument("--dry-run", action="store_true", help="print the new parameters instead of writing them")
+    args = parser.parse_args()
+
+    def change(pnginfo_dict):
+        for old, new in args.replace:
+            pnginfo_dict = {k: v.replace(old, new) for k, v in pnginfo_dict.items()}
+        for key in args.unset:
+            pnginfo_dict.pop(key, None)
+        pnginfo_dict.update(args.set)
+        return pnginfo_dict
+
+    def preview(file):
+        pnginfo_dict = parse_parameters(read_parameters(file))
+        if not pnginfo_dict:
+            return None
+        print(f"{file}:\n{format_parameters(change(pnginfo_dict))}")
+        return pnginfo_dict
+
+    updated = failed = 0
+    for path in args.paths:
+        for file in iter_image_paths(path) if os.path.isdir(path) else [path]:
+            try:
+                result = preview(file) if args.dry_run else update_parameters(file, change)
+            except (OSError, ValueError) as e:
+                print(f"{file}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            if result is None:
+                print(f"{file}: no parameters, skipped", file=sys.stderr)
+            else:
+                updated += 1
+    print(f"{updated} image(s) {'checked' if args.dry_run else 'updated'}, {failed} failed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()